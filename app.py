@@ -1,9 +1,24 @@
 from flask import Flask, render_template, request, jsonify
-from stock_logic import get_expiry_dates, analyze_data_for_visualization
+from stock_logic import get_expiry_dates, analyze_data_for_visualization, analyze_term_structure, analyze_batch, get_metrics, BATCH_MAX_ITEMS, IV_SOURCES, BOX_RANGE_LIMIT
+from warmer import cache_warmer, live_requests
+import os
 import pandas as pd
 
 app = Flask(__name__)
 
+# 인기 티커 캐시 예열 (CACHE_WARMER=0 으로 끌 수 있습니다)
+if os.environ.get("CACHE_WARMER", "1") != "0":
+    cache_warmer.start()
+
+# 예열 작업이 실시간 요청에 양보할 수 있도록 처리 중인 요청 수를 셉니다.
+@app.before_request
+def track_live_request():
+    live_requests.begin()
+
+@app.teardown_request
+def untrack_live_request(exc):
+    live_requests.end()
+
 # 초기 화면 - 종목 검색
 @app.route('/')
 def index():
@@ -27,12 +42,19 @@ def get_expiries_api():
 def report():
     ticker = request.form.get('ticker', '').upper()
     expiry_date = request.form.get('expiry_date')
+    # 체크하면 업스트림 IV 대신 bid/ask 중간값으로 다시 계산한 IV를 사용합니다.
+    iv_source = request.form.get('iv_source') if request.form.get('iv_source') in IV_SOURCES else None
+    # 박스권 계산 범위(현재가 대비 ±%). 잘못된 값이면 기본값을 씁니다.
+    try:
+        strike_distance_limit = min(max(float(request.form.get('box_range_percent')) / 100, 0.01), 1.0)
+    except (TypeError, ValueError):
+        strike_distance_limit = BOX_RANGE_LIMIT
 
     if not ticker or not expiry_date:
         return "오류: 티커와 만기일을 모두 올바르게 선택해야 합니다.", 400
 
     # stock_logic에서 구조화된 데이터 받아오기
-    viz_data = analyze_data_for_visualization(ticker, expiry_date)
+    viz_data = analyze_data_for_visualization(ticker, expiry_date, iv_source, strike_distance_limit)
 
     if viz_data.get("error"):
         return f"분석 중 오류 발생: {viz_data['error']}", 500
@@ -40,5 +62,51 @@ def report():
     # report.html에 데이터 전체를 전달
     return render_template('report.html', data=viz_data)
 
+# 티커의 모든 만기일을 한 번에 분석하는 만기 구조 리포트
+@app.route('/term-structure', methods=['GET', 'POST'])
+def term_structure():
+    ticker = (request.values.get('ticker') or '').upper()
+    if not ticker:
+        return "오류: 티커를 입력해야 합니다.", 400
+
+    iv_source = request.values.get('iv_source') if request.values.get('iv_source') in IV_SOURCES else None
+    term_data = analyze_term_structure(ticker, iv_source)
+
+    if term_data.get("error"):
+        return f"분석 중 오류 발생: {term_data['error']}", 500
+
+    return render_template('term_structure.html', data=term_data)
+
+# 여러 티커를 한 번에 분석하는 JSON API
+# {"items": [{"ticker": "SPY", "expiry_date": "2025-01-17"}, ...]} 또는
+# {"tickers": ["SPY", "QQQ"]} (가장 가까운 만기일) 형태로 요청합니다.
+@app.route('/api/batch-report', methods=['POST'])
+def batch_report():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "요청 본문은 JSON 객체여야 합니다."}), 400
+    raw_items, raw_tickers = payload.get('items', []), payload.get('tickers', [])
+    if not isinstance(raw_items, list) or not isinstance(raw_tickers, list):
+        return jsonify({"error": "items와 tickers는 목록이어야 합니다."}), 400
+
+    # /report와 같이 티커를 대문자로 맞춰 캐시와 요청 합치기 키가 갈라지지 않게 합니다.
+    items = [(str(item.get('ticker', '')).strip().upper(), item.get('expiry_date') or None)
+             for item in raw_items if isinstance(item, dict)]
+    items += [(str(ticker).strip().upper(), None) for ticker in raw_tickers]
+    items = [(ticker, expiry_date) for ticker, expiry_date in items if ticker]
+
+    if not items:
+        return jsonify({"error": "분석할 티커를 입력하세요."}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"한 번에 최대 {BATCH_MAX_ITEMS}개까지 분석할 수 있습니다."}), 400
+
+    iv_source = payload.get('iv_source') if payload.get('iv_source') in IV_SOURCES else None
+    return jsonify(analyze_batch(items, include_chart=bool(payload.get('include_chart')), iv_source=iv_source))
+
+# 캐시, 요청 합치기, 데이터 제공자, 예열 지표를 확인하는 API
+@app.route('/metrics')
+def metrics():
+    return jsonify({**get_metrics(), "warmer": cache_warmer.stats()})
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
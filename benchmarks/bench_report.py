@@ -0,0 +1,112 @@
+"""
+리포트 1건당 분석 CPU 시간 벤치마크 (네트워크 없음).
+
+이전 방식(요청마다 타입 변환 + 여러 번의 pandas 연산)과
+현재 방식(캐시된 ChainSnapshot + 단일 패스 지표 커널)을 SPY 규모의 합성 체인으로 비교합니다.
+'현재'와 '배속'은 이전 방식과 같은 지표만 계산하는 경로(details=False)이고,
+이후 추가된 맥스 페인, GEX, 계약별 그릭스, 차트 데이터까지 계산하는 리포트 경로(details=True)는 '전체' 열에 따로 표시합니다.
+두 경로 모두 캐시에서 꺼낸 것처럼 같은 스냅샷을 재사용하며, 분석 결과 캐시는 거치지 않습니다.
+
+    python benchmarks/bench_report.py [행사가 수 ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain import ChainSnapshot  # noqa: E402
+from stock_logic import analyze_chain  # noqa: E402
+
+SPOT = 500.0
+EXPIRY = "2030-01-18"
+
+
+def synthetic_chain(strike_count, seed=0):
+    """yfinance option_chain과 같은 열 구성을 가진 합성 콜/풋 DataFrame을 만듭니다."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for kind in ("C", "P"):
+        strikes = np.round(np.linspace(SPOT * 0.3, SPOT * 1.7, strike_count) * 2) / 2
+        n = strikes.size
+        frames.append(pd.DataFrame({
+            "contractSymbol": [f"SPY300118{kind}{int(k * 1000):08d}" for k in strikes],
+            "strike": strikes,
+            "lastPrice": rng.random(n) * 20,
+            "bid": rng.random(n) * 10,
+            "ask": rng.random(n) * 10 + 10,
+            "change": rng.normal(size=n),
+            "volume": np.where(rng.random(n) > 0.2, rng.integers(0, 5000, n).astype(float), np.nan),
+            "openInterest": rng.integers(0, 20000, n),
+            "impliedVolatility": rng.random(n) * 0.5 + 0.1,
+        }))
+    return frames[0], frames[1]
+
+
+def legacy_box_range_weighted(df, current_price, strike_distance_limit=0.3):
+    """이전 get_box_range_weighted (between 필터 + .copy() + idxmax)를 그대로 옮긴 것입니다."""
+    if df.empty: return None
+    lower_bound = current_price * (1 - strike_distance_limit)
+    upper_bound = current_price * (1 + strike_distance_limit)
+    df_filtered = df[df["strike"].between(lower_bound, upper_bound)].copy()
+    if df_filtered.empty or df_filtered["openInterest"].sum() == 0: return None
+    df_filtered["WeightedScore"] = df_filtered["openInterest"] * 0.3 + df_filtered["volume"] * 0.7
+    if df_filtered["WeightedScore"].max() == 0: return None
+    return df_filtered.loc[df_filtered["WeightedScore"].idxmax(), "strike"]
+
+
+def legacy_report(call_df, put_df, current_price):
+    """이전 analyze_data_for_visualization의 CPU 작업(요청마다 타입 변환 + pandas 집계)을 재현합니다."""
+    call_df, put_df = call_df.copy(), put_df.copy()
+    for df in [call_df, put_df]:
+        df["contractSymbol"] = df["contractSymbol"].astype(str)
+        for col in ("volume", "openInterest", "strike", "impliedVolatility", "lastPrice", "bid", "ask", "change"):
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    total_call_volume = call_df['volume'].sum()
+    total_put_volume = put_df['volume'].sum()
+    atm_call_iv = call_df.iloc[(call_df['strike'] - current_price).abs().idxmin()]['impliedVolatility']
+    atm_put_iv = put_df.iloc[(put_df['strike'] - current_price).abs().idxmin()]['impliedVolatility']
+    mean_iv = (call_df['impliedVolatility'].mean() + put_df['impliedVolatility'].mean()) / 2 * 100
+    oi_total = call_df['openInterest'].sum() + put_df['openInterest'].sum()
+    call_atm_mask = call_df['strike'].between(current_price * 0.95, current_price * 1.05)
+    put_atm_mask = put_df['strike'].between(current_price * 0.95, current_price * 1.05)
+    atm_volume = call_df[call_atm_mask]['volume'].sum() + put_df[put_atm_mask]['volume'].sum()
+    highest_change_call = call_df.loc[call_df['change'].abs().idxmax()]
+    highest_change_put = put_df.loc[put_df['change'].abs().idxmax()]
+    means = (put_df['volume'].mean(), call_df['volume'].mean())
+    top = (call_df.loc[call_df['volume'].idxmax()], put_df.loc[put_df['volume'].idxmax()])
+    box = (legacy_box_range_weighted(put_df, current_price), legacy_box_range_weighted(call_df, current_price))
+    chart = [call_df['strike'].tolist(), call_df['openInterest'].astype(int).tolist(),
+             put_df['openInterest'].astype(int).tolist(), call_df['volume'].astype(int).tolist(),
+             put_df['volume'].astype(int).tolist()]
+    return (total_call_volume, total_put_volume, atm_call_iv, atm_put_iv, mean_iv, oi_total, atm_volume,
+            highest_change_call, highest_change_put, means, top, box, chart)
+
+
+def cpu_ms_per_call(func, repeat):
+    func()
+    started = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - started) / repeat * 1000
+
+
+def main(strike_counts):
+    print(f"{'행사가 수':>10} {'이전(ms)':>10} {'현재(ms)':>10} {'배속':>8} {'전체(ms)':>10}")
+    for strike_count in strike_counts:
+        call_df, put_df = synthetic_chain(strike_count)
+        snapshot = ChainSnapshot(call_df, put_df)
+        repeat = max(20, 20000 // strike_count)
+        before = cpu_ms_per_call(lambda: legacy_report(call_df, put_df, SPOT), repeat)
+        after = cpu_ms_per_call(lambda: analyze_chain(snapshot.calls, snapshot.puts, SPOT, EXPIRY,
+                                                      snapshot=snapshot, details=False), repeat)
+        full = cpu_ms_per_call(lambda: analyze_chain(snapshot.calls, snapshot.puts, SPOT, EXPIRY,
+                                                     snapshot=snapshot), repeat)
+        print(f"{strike_count:>10} {before:>10.3f} {after:>10.3f} {before / after:>7.1f}x {full:>10.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [200, 1000, 5000])
@@ -0,0 +1,686 @@
+import datetime
+import json
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from zoneinfo import ZoneInfo
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pyarrow가 없으면 디스크 캐시를 사용하지 않습니다.
+    pa = None
+
+try:
+    import redis
+except ImportError:  # redis가 없으면 Redis 공유 캐시를 사용하지 않습니다.
+    redis = None
+
+# ======================================================================
+# 섹션 1: 미국 장 시간 판별
+# ======================================================================
+
+MARKET_TZ = ZoneInfo("America/New_York")
+EXTENDED_OPEN = datetime.time(4, 0)
+REGULAR_OPEN = datetime.time(9, 30)
+REGULAR_CLOSE = datetime.time(16, 0)
+EXTENDED_CLOSE = datetime.time(20, 0)
+
+# 프리/애프터마켓에는 호가 변화가 적으므로 TTL을 이만큼 늘립니다.
+EXTENDED_HOURS_TTL_FACTOR = 4
+
+
+def market_session(now=None):
+    """현재 미국 시장 세션을 'regular', 'extended', 'closed' 중 하나로 반환합니다."""
+    now = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(MARKET_TZ)
+    # 공휴일은 따로 판별하지 않습니다 (정규장 TTL이 적용될 뿐 데이터는 정확합니다).
+    if now.weekday() >= 5:
+        return "closed"
+    t = now.time()
+    if REGULAR_OPEN <= t < REGULAR_CLOSE:
+        return "regular"
+    if EXTENDED_OPEN <= t < EXTENDED_CLOSE:
+        return "extended"
+    return "closed"
+
+
+def seconds_until_next_session(now=None):
+    """다음 거래일 프리마켓 개장(04:00 ET)까지 남은 초를 반환합니다."""
+    now = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(MARKET_TZ)
+    day = now.date()
+    if now.time() >= EXTENDED_OPEN:
+        day += datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day += datetime.timedelta(days=1)
+    next_open = datetime.datetime.combine(day, EXTENDED_OPEN, tzinfo=MARKET_TZ)
+    return (next_open - now).total_seconds()
+
+
+def market_ttl(base_ttl, now=None):
+    """장 시간에 맞춰 늘린 TTL(초)을 반환합니다."""
+    session = market_session(now)
+    if session == "regular":
+        return base_ttl
+    if session == "extended":
+        return base_ttl * EXTENDED_HOURS_TTL_FACTOR
+    # 장이 닫혀 있으면 다음 개장 전까지 데이터가 바뀌지 않습니다.
+    return max(base_ttl, seconds_until_next_session(now))
+
+# ======================================================================
+# 섹션 2: TTL 캐시
+# ======================================================================
+
+_MISSING = object()
+
+
+class TTLCache:
+    """항목마다 만료 시각을 가지는 스레드 안전 LRU 캐시입니다.
+
+    만료 뒤에도 stale_ttl 동안은 lookup()으로 '오래된(stale)' 값을 꺼낼 수 있습니다.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """(상태, 값, 수집 시각)을 반환합니다. 상태는 'fresh', 'stale', 'miss' 중 하나입니다."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return "miss", None, None
+            expires_at, _, fetched_at, value = entry
+            self._data.move_to_end(key)
+            if expires_at > now:
+                self.hits += 1
+                return "fresh", value, fetched_at
+            self.stale_hits += 1
+            return "stale", value, fetched_at
+
+    def get(self, key, default=_MISSING):
+        state, value, _ = self.lookup(key)
+        return value if state == "fresh" else default
+
+    def peek(self, key, default=None):
+        """적중/미스 통계와 LRU 순서를 건드리지 않고 신선한 값만 확인합니다."""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[0] <= time.time():
+            return default
+        return entry[3]
+
+    def set(self, key, value, ttl, stale_ttl=0, fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        expires_at = fetched_at + ttl
+        with self._lock:
+            self._data[key] = (expires_at, expires_at + stale_ttl, fetched_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.stale_hits = self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                    "size": len(self._data), "maxsize": self.maxsize}
+
+
+# ======================================================================
+# 섹션 3: 동일 요청 합치기 (single-flight)
+# ======================================================================
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 하나의 실제 호출로 합치고 결과를 공유합니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def info(self):
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced,
+                    "in_flight": len(self._calls)}
+
+# ======================================================================
+# 섹션 4: 페처용 캐시 데코레이터
+# ======================================================================
+
+class NegativeResult:
+    """페처가 '확실히 존재하지 않는 데이터'(잘못된 티커, 없는 만기일)를 알릴 때 반환하는 표식입니다.
+
+    데코레이터는 감싼 value를 호출자에게 돌려주고, 키를 네거티브 캐시에 기록합니다.
+    네트워크 장애 같은 일시적 실패는 이 표식 없이 대체값만 반환해야 합니다.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+# 만료 직후(stale) 항목을 백그라운드에서 새로 고치는 스레드 풀
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+
+def market_ttl_cache(base_ttl, maxsize=128, stale_ttl=0, is_valid=None, timestamp_of=None,
+                     negative_cache=None, negative_ttl=600, shared_cache=None):
+    """lru_cache 대신 사용하는 데코레이터입니다.
+
+    장 시간에 따라 TTL이 늘어나고, 캐시 미스가 동시에 나면 실제 호출은 한 번만 일어납니다.
+    stale_ttl을 주면 만료 후 그 시간까지는 오래된 값을 바로 반환하고 백그라운드에서 새로 고칩니다
+    (stale-while-revalidate). is_valid를 통과하지 못한 결과는 캐시하지 않으며,
+    백그라운드 갱신이 실패하면 기존 값을 유지합니다.
+    함수가 NegativeResult를 반환하면 결과는 본 캐시 대신 negative_cache에 negative_ttl 동안 저장됩니다.
+    negative_cache는 본 캐시에 쓸 수 있는 값이 없을 때만 확인하며, 정상 값이 저장되면 해당 기록을 지웁니다.
+    timestamp_of(value)는 값의 실제 수집 시각(epoch 초)을 알려 줄 때 사용합니다 (예: 디스크 캐시 적중).
+    shared_cache를 주면 메모리 캐시 미스 시 워커 간 공유 캐시를 먼저 확인하고, 새로 가져온 값을 공유합니다.
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize)
+        flight = SingleFlight()
+        pending = set()
+        pending_lock = threading.Lock()
+        stats = {"refreshes": 0, "refresh_errors": 0}
+
+        def store(key, value, fetched_at):
+            fetched_dt = datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc)
+            ttl = market_ttl(base_ttl, fetched_dt)
+            cache.set(key, value, ttl, stale_ttl, fetched_at)
+            return ttl
+
+        def shared_key(key):
+            return f"{func.__name__}:{key!r}"
+
+        def load(key, args, kwargs):
+            if shared_cache is not None:
+                shared = shared_cache.get(shared_key(key))
+                if shared is not None:
+                    value, fetched_at = shared
+                    store(key, value, fetched_at)
+                    return value, fetched_at
+            return remember(key, func(*args, **kwargs))
+
+        def remember(key, value):
+            """새로 가져온 값을 캐시(또는 네거티브 캐시)와 공유 캐시에 넣고 (값, 수집 시각)을 반환합니다."""
+            if isinstance(value, NegativeResult):
+                if negative_cache is not None:
+                    negative_cache.set((func.__name__,) + key, value.value, negative_ttl)
+                return value.value, None
+            if is_valid is not None and not is_valid(value):
+                return value, None
+            if negative_cache is not None:
+                # 정상 값을 받았으므로 이전의 '없음' 기록은 더 이상 맞지 않습니다.
+                negative_cache.discard((func.__name__,) + key)
+            fetched_at = (timestamp_of(value) if timestamp_of else None) or time.time()
+            ttl = store(key, value, fetched_at)
+            if shared_cache is not None:
+                shared_cache.set(shared_key(key), value, fetched_at, fetched_at + ttl)
+            return value, fetched_at
+
+        def refresh(key, args, kwargs):
+            outcome = "refreshes"
+            try:
+                flight.do(key, load, key, args, kwargs)
+            except Exception as e:
+                outcome = "refresh_errors"
+                print(f"백그라운드 캐시 갱신 오류: {func.__name__}{args} - {e}")
+            finally:
+                with pending_lock:
+                    pending.discard(key)
+                    stats[outcome] += 1
+
+        def with_timestamp(*args, **kwargs):
+            """(값, 수집 시각 epoch 초) 튜플을 반환합니다."""
+            key = args + tuple(sorted(kwargs.items()))
+            state, value, fetched_at = cache.lookup(key)
+            if state == "fresh":
+                return value, fetched_at
+            if state == "stale":
+                with pending_lock:
+                    start_refresh = key not in pending
+                    pending.add(key)
+                if start_refresh:
+                    _refresh_pool.submit(refresh, key, args, kwargs)
+                return value, fetched_at
+            # 본 캐시에 값이 없을 때만 네거티브 캐시를 봅니다 (갱신 실패가 아직 쓸 수 있는 값을 가리지 않도록).
+            if negative_cache is not None:
+                value = negative_cache.get((func.__name__,) + key)
+                if value is not _MISSING:
+                    return value, None
+            return flight.do(key, load, key, args, kwargs)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return with_timestamp(*args, **kwargs)[0]
+
+        def prime(value, *args, **kwargs):
+            """다른 경로(예: 저우선순위 미리 받기)로 가져온 값을 func(*args, **kwargs)의 결과로 캐시에 넣습니다."""
+            return remember(args + tuple(sorted(kwargs.items())), value)[0]
+
+        def peek(*args, **kwargs):
+            """호출 없이 캐시에 있는 신선한 값만 반환하고, 없으면 None을 반환합니다."""
+            return cache.peek(args + tuple(sorted(kwargs.items())))
+
+        def cache_info():
+            with pending_lock:
+                refresh_stats = dict(stats)
+            return {**cache.info(), **flight.info(), **refresh_stats}
+
+        wrapper.cache = cache
+        wrapper.flight = flight
+        wrapper.with_timestamp = with_timestamp
+        wrapper.peek = peek
+        wrapper.prime = prime
+        wrapper.cache_clear = cache.clear
+        wrapper.cache_info = cache_info
+        return wrapper
+    return decorator
+
+# ======================================================================
+# 섹션 5: 디스크 L2 옵션 체인 캐시 (Arrow IPC)
+# ======================================================================
+
+# 디렉터리 이름으로 쓸 수 있는 만기일 형식 (사용자 입력이 경로에 그대로 들어가지 않도록 제한합니다)
+_EXPIRY_DIR = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class DiskChainCache:
+    """콜/풋 DataFrame을 Arrow IPC 파일로 저장하는 L2 캐시입니다.
+
+    파일은 <디렉터리>/<티커>/<만기일>/<수집시각>.calls.arrow 형태로 저장되며,
+    메모리 맵으로 읽기 때문에 워커가 재시작돼도 네트워크 없이 체인을 제공할 수 있습니다.
+    만료 규칙은 메모리 캐시와 같은 market_ttl을 수집 시각 기준으로 적용합니다.
+    만료 후 stale_ttl까지 지난 만기일/티커 디렉터리는 쓰기 도중 SWEEP_INTERVAL마다 정리합니다.
+    """
+
+    # 오래된 디렉터리를 정리하는 최소 간격(초)
+    SWEEP_INTERVAL = 10 * 60
+
+    def __init__(self, directory, base_ttl, stale_ttl=0):
+        self.directory = directory
+        self.base_ttl = base_ttl
+        self.stale_ttl = stale_ttl
+        self.enabled = pa is not None
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.swept = 0
+
+    def _key_dir(self, ticker, expiry_date):
+        """키의 디렉터리 경로를 반환합니다. 경로로 쓸 수 없는 티커나 YYYY-MM-DD가 아닌 만기일이면 None을 반환합니다."""
+        safe_ticker = re.sub(r"[^A-Za-z0-9._^=-]", "_", str(ticker).upper())
+        if not safe_ticker.strip("."):
+            return None
+        if expiry_date is None:
+            return os.path.join(self.directory, safe_ticker, "nearest")
+        if not isinstance(expiry_date, str) or not _EXPIRY_DIR.fullmatch(expiry_date):
+            return None
+        return os.path.join(self.directory, safe_ticker, expiry_date)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _read(path):
+        with pa.memory_map(path, "r") as source:
+            return pa_ipc.open_file(source).read_all().to_pandas()
+
+    @staticmethod
+    def _write(path, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa_ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    def _stamps(self, key_dir):
+        try:
+            names = os.listdir(key_dir)
+        except FileNotFoundError:
+            return []
+        return sorted((int(n.split(".")[0]) for n in names if n.endswith(".calls.arrow")), reverse=True)
+
+    def get(self, ticker, expiry_date, allow_expired=False):
+        """만료되지 않은 (콜, 풋) 튜플을 반환하고, 없으면 None을 반환합니다.
+
+        allow_expired=True면 업스트림 장애 시 대체용으로 만료된 파일도 반환합니다.
+        """
+        if not self.enabled:
+            return None
+        key_dir = self._key_dir(ticker, expiry_date)
+        stamps = self._stamps(key_dir) if key_dir else []
+        if stamps:
+            stamp = stamps[0]
+            fetched_at = datetime.datetime.fromtimestamp(stamp, datetime.timezone.utc)
+            if allow_expired or time.time() < stamp + market_ttl(self.base_ttl, fetched_at):
+                try:
+                    calls = self._read(os.path.join(key_dir, f"{stamp}.calls.arrow"))
+                    puts = self._read(os.path.join(key_dir, f"{stamp}.puts.arrow"))
+                    calls.attrs["fetched_at"] = puts.attrs["fetched_at"] = stamp
+                    self._count("hits")
+                    return calls, puts
+                except (OSError, pa.ArrowException) as e:
+                    print(f"디스크 캐시 읽기 오류: {ticker}, {expiry_date} - {e}")
+        self._count("misses")
+        return None
+
+    def set(self, ticker, expiry_date, calls, puts):
+        """체인을 현재 시각 기준으로 저장하고, 같은 키의 이전 파일은 지웁니다."""
+        if not self.enabled:
+            return
+        key_dir = self._key_dir(ticker, expiry_date)
+        if key_dir is None:
+            return
+        stamp = int(time.time())
+        try:
+            os.makedirs(key_dir, exist_ok=True)
+            # 읽는 쪽은 calls 파일을 기준으로 찾으므로 puts를 먼저 씁니다.
+            self._write(os.path.join(key_dir, f"{stamp}.puts.arrow"), puts)
+            self._write(os.path.join(key_dir, f"{stamp}.calls.arrow"), calls)
+            self._count("writes")
+            for old in self._stamps(key_dir)[1:]:
+                for side in ("calls", "puts"):
+                    try:
+                        os.remove(os.path.join(key_dir, f"{old}.{side}.arrow"))
+                    except FileNotFoundError:
+                        pass
+        except (OSError, pa.ArrowException) as e:
+            print(f"디스크 캐시 쓰기 오류: {ticker}, {expiry_date} - {e}")
+        self._maybe_sweep()
+
+    def _maybe_sweep(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+        self.sweep(now)
+
+    def sweep(self, now=None):
+        """만료 후 stale_ttl이 지난 만기일 디렉터리와 비게 된 티커 디렉터리를 지우고, 지운 만기일 수를 반환합니다.
+
+        지난 만기일이나 더 이상 조회하지 않는 티커의 파일은 set()이 다시 덮어쓰지 않으므로 여기서 지웁니다.
+        """
+        now = now or time.time()
+        removed = 0
+        try:
+            tickers = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for ticker in tickers:
+            ticker_dir = os.path.join(self.directory, ticker)
+            try:
+                keys = os.listdir(ticker_dir)
+            except OSError:
+                continue
+            for key in keys:
+                key_dir = os.path.join(ticker_dir, key)
+                stamps = self._stamps(key_dir)
+                try:
+                    # 파일이 아직 없는 디렉터리(쓰기 중)는 디렉터리 수정 시각을 기준으로 봅니다.
+                    stamp = stamps[0] if stamps else int(os.path.getmtime(key_dir))
+                except OSError:
+                    continue
+                fetched_at = datetime.datetime.fromtimestamp(stamp, datetime.timezone.utc)
+                if now < stamp + market_ttl(self.base_ttl, fetched_at) + self.stale_ttl:
+                    continue
+                shutil.rmtree(key_dir, ignore_errors=True)
+                removed += 1
+            try:
+                os.rmdir(ticker_dir)  # 비어 있을 때만 지워집니다.
+            except OSError:
+                pass
+        with self._lock:
+            self.swept += removed
+        return removed
+
+    def info(self):
+        with self._lock:
+            return {"enabled": self.enabled, "directory": self.directory,
+                    "hits": self.hits, "misses": self.misses, "writes": self.writes, "swept": self.swept}
+
+# ======================================================================
+# 섹션 6: 워커 간 공유 캐시 (Redis / SQLite)
+# ======================================================================
+
+# 공유 캐시 값 형식: b"J" + JSON({"value", "fetched_at"}) 또는
+# b"A" + (수집 시각, 콜 Arrow 스트림 길이) 헤더 + 콜 Arrow IPC 스트림 + 풋 Arrow IPC 스트림
+_JSON_TAG = b"J"
+_ARROW_TAG = b"A"
+_ARROW_HEADER = struct.Struct("<dQ")
+
+
+def _arrow_stream(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa_ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _read_arrow_stream(data):
+    return pa_ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+
+
+class SharedCache:
+    """여러 워커 프로세스가 함께 쓰는 캐시 백엔드의 공통 부분입니다.
+
+    저장소에서 읽은 바이트로 코드가 실행되지 않도록 pickle은 쓰지 않습니다.
+    옵션 체인(calls/puts DataFrame을 가진 값)은 Arrow IPC로, 현재가와 만기일 목록은 JSON으로 저장하며,
+    체인은 chain_factory(calls, puts, fetched_at)로 다시 만듭니다 (pyarrow나 chain_factory가 없으면 체인은 공유하지 않습니다).
+    백엔드 오류와 알 수 없는 형식은 캐시 미스로 취급해 요청 처리를 막지 않습니다.
+    """
+
+    name = "base"
+
+    def __init__(self, namespace="", chain_factory=None):
+        # 데이터 제공자별로 키 공간을 나눠 픽스처 데이터가 실제 데이터와 섞이지 않게 합니다.
+        self.prefix = f"stock_stat:{namespace}:"
+        self.chain_factory = chain_factory
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _get_raw(self, key):
+        raise NotImplementedError
+
+    def _set_raw(self, key, data, expires_at):
+        raise NotImplementedError
+
+    def _encode(self, value, fetched_at):
+        """값을 저장할 바이트로 바꿉니다. 공유할 수 없는 값이면 None을 반환합니다."""
+        if getattr(value, "calls", None) is None:
+            return _JSON_TAG + json.dumps({"value": value, "fetched_at": fetched_at}).encode()
+        if pa is None or self.chain_factory is None:
+            return None
+        calls, puts = _arrow_stream(value.calls), _arrow_stream(value.puts)
+        return _ARROW_TAG + _ARROW_HEADER.pack(fetched_at, len(calls)) + calls + puts
+
+    def _decode(self, data):
+        """저장된 바이트를 (값, 수집 시각)으로 되돌립니다. 읽을 수 없는 형식이면 None을 반환합니다."""
+        data = memoryview(data)
+        tag, body = bytes(data[:1]), data[1:]
+        if tag == _JSON_TAG:
+            decoded = json.loads(bytes(body))
+            return decoded["value"], decoded["fetched_at"]
+        if tag == _ARROW_TAG and pa is not None and self.chain_factory is not None:
+            fetched_at, calls_size = _ARROW_HEADER.unpack_from(body)
+            start = _ARROW_HEADER.size
+            calls = _read_arrow_stream(body[start:start + calls_size])
+            puts = _read_arrow_stream(body[start + calls_size:])
+            return self.chain_factory(calls, puts, fetched_at), fetched_at
+        return None
+
+    def get(self, key):
+        """(값, 수집 시각)을 반환하고, 없거나 만료됐으면 None을 반환합니다."""
+        try:
+            data = self._get_raw(self.prefix + key)
+            entry = self._decode(data) if data is not None else None
+        except Exception as e:
+            self._count("errors")
+            print(f"공유 캐시 읽기 오류 ({self.name}): {key} - {e}")
+            return None
+        if entry is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return entry
+
+    def set(self, key, value, fetched_at, expires_at):
+        if expires_at <= time.time():
+            return
+        try:
+            data = self._encode(value, fetched_at)
+            if data is None:
+                return
+            self._set_raw(self.prefix + key, data, expires_at)
+            self._count("writes")
+        except Exception as e:
+            self._count("errors")
+            print(f"공유 캐시 쓰기 오류 ({self.name}): {key} - {e}")
+
+    def info(self):
+        with self._lock:
+            return {"backend": self.name, "hits": self.hits, "misses": self.misses,
+                    "writes": self.writes, "errors": self.errors}
+
+
+class RedisSharedCache(SharedCache):
+    """Redis 프로토콜 저장소를 사용하는 공유 캐시입니다."""
+
+    name = "redis"
+
+    def __init__(self, url, namespace="", chain_factory=None):
+        super().__init__(namespace, chain_factory)
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def _get_raw(self, key):
+        return self._client.get(key)
+
+    def _set_raw(self, key, data, expires_at):
+        self._client.set(key, data, px=max(int((expires_at - time.time()) * 1000), 1))
+
+
+class SQLiteSharedCache(SharedCache):
+    """같은 호스트의 워커끼리 공유하는 SQLite 파일 캐시입니다 (Redis가 없을 때와 테스트용)."""
+
+    name = "sqlite"
+    # 쓰기 이만큼마다 만료된 행을 정리합니다.
+    PURGE_EVERY = 200
+
+    def __init__(self, path, namespace="", chain_factory=None):
+        super().__init__(namespace, chain_factory)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _get_raw(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def _set_raw(self, key, data, expires_at):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, data, expires_at))
+            if self.writes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+
+def open_shared_cache(url, namespace="", chain_factory=None):
+    """URL(redis://..., sqlite:///경로)에 맞는 공유 캐시를 만듭니다. 빈 URL이면 None을 반환합니다.
+
+    SQLite 파일은 다른 사용자가 쓸 수 없는 디렉터리에 두어야 합니다 (공용 /tmp 등은 피하세요).
+    """
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if redis is not None:
+            return RedisSharedCache(url, namespace, chain_factory)
+        print("redis 패키지가 없어 공유 캐시를 사용하지 않습니다.")
+        return None
+    try:
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url
+        return SQLiteSharedCache(path, namespace, chain_factory)
+    except sqlite3.Error as e:
+        print(f"공유 캐시를 열 수 없습니다: {url} - {e}")
+        return None
@@ -0,0 +1,252 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ======================================================================
+# 섹션 1: 옵션 체인 정규화
+# ======================================================================
+
+# 분석에 쓰는 숫자 열. 캐시에 들어올 때 한 번만 숫자로 변환하고 결측치는 0으로 채웁니다.
+NUMERIC_COLUMNS = ("volume", "openInterest", "strike", "impliedVolatility",
+                   "lastPrice", "bid", "ask", "change")
+
+
+def normalize_chain_frame(df):
+    """숫자 열을 float으로 변환하고 contractSymbol을 문자열로 맞춘 새 DataFrame을 반환합니다."""
+    columns = {}
+    for col in df.columns:
+        if col in NUMERIC_COLUMNS:
+            columns[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(float)
+        elif col == "contractSymbol":
+            columns[col] = df[col].astype(str)
+        else:
+            columns[col] = df[col]
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _freeze(df):
+    """숫자 열을 읽기 전용 NumPy 배열로 감싼 DataFrame을 반환합니다."""
+    columns = {}
+    for col in df.columns:
+        if col in NUMERIC_COLUMNS:
+            values = df[col].to_numpy(dtype=float, copy=True)
+            values.flags.writeable = False
+            columns[col] = values
+        else:
+            columns[col] = df[col]
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+# 스냅샷마다 보관할 파생 계산 결과(그릭스 등)의 최대 개수. 현재가가 바뀔 때마다 항목이 늘어나므로 제한합니다.
+MEMO_MAXSIZE = 8
+
+# ======================================================================
+# 섹션 2: 정렬된 행사가 인덱스
+# ======================================================================
+
+class StrikeIndex:
+    """한쪽(콜 또는 풋) 체인(DataFrame 또는 열 이름 → 배열 딕셔너리)의 행사가 정렬 인덱스입니다.
+
+    정렬은 생성 시 한 번만 하고, ATM 검색과 행사가 구간(머니니스 창, 박스권) 조회는
+    이진 탐색으로 정렬된 위치의 slice를 구합니다. 구간 합계는 열별 누적합으로 O(1)에 계산합니다.
+    같은 행사가는 원래 행 순서를 유지합니다(stable 정렬).
+    """
+
+    __slots__ = ("df", "order", "strikes", "_sorted", "_prefix", "_argmax")
+
+    def __init__(self, df):
+        self.df = df
+        strikes = np.asarray(df["strike"], dtype=float)
+        self.order = np.argsort(strikes, kind="stable")
+        self.strikes = strikes[self.order]
+        self._sorted = {}
+        self._prefix = {}
+        self._argmax = {}
+
+    def __len__(self):
+        return self.strikes.size
+
+    def sorted_values(self, name):
+        """열 값을 행사가 순서로 정렬한 배열을 반환합니다 (열마다 한 번만 계산)."""
+        values = self._sorted.get(name)
+        if values is None:
+            values = self._sorted[name] = np.asarray(self.df[name], dtype=float)[self.order]
+        return values
+
+    def window(self, lower, upper):
+        """lower <= 행사가 <= upper인 계약의 정렬된 위치 slice를 반환합니다."""
+        return slice(int(np.searchsorted(self.strikes, lower, side="left")),
+                     int(np.searchsorted(self.strikes, upper, side="right")))
+
+    def band(self, center, fraction):
+        """center ± fraction 비율의 행사가 구간(예: 현재가 ±5%)을 반환합니다."""
+        return self.window(center * (1 - fraction), center * (1 + fraction))
+
+    def prefix(self, name):
+        """행사가 순 누적합을 앞에 0을 붙여 반환합니다 (prefix[i] = 정렬된 앞 i개의 합)."""
+        values = self._prefix.get(name)
+        if values is None:
+            values = self._prefix[name] = np.concatenate((np.zeros(1), np.cumsum(self.sorted_values(name))))
+        return values
+
+    def range_sum(self, name, window):
+        prefix = self.prefix(name)
+        return float(prefix[window.stop] - prefix[window.start])
+
+    def total(self, name):
+        return self.range_sum(name, slice(0, len(self)))
+
+    def nearest(self, price):
+        """price에 가장 가까운 행사가의 원래 행 번호를 반환합니다.
+
+        거리가 같은 계약이 여러 개면(양옆 행사가가 같은 거리이거나 같은 행사가가 중복) 원래 순서상 첫 행을 씁니다.
+        """
+        position = int(np.searchsorted(self.strikes, price))
+        neighbors = self.strikes[max(position - 1, 0):position + 1]
+        distance = np.abs(neighbors - price)
+        closest = neighbors[distance == distance.min()]
+        lower = np.searchsorted(self.strikes, closest[0], side="left")
+        upper = np.searchsorted(self.strikes, closest[-1], side="right")
+        return int(self.order[lower:upper].min())
+
+    def first_row(self, window, mask):
+        """window 안에서 mask가 참인 계약 중 원래 순서상 첫 행 번호를 반환합니다."""
+        return int(self.order[window][mask].min())
+
+    def argmax(self, name, absolute=False):
+        """열 값(또는 절댓값)이 가장 큰 원래 행 번호를 반환합니다 (현재가와 무관하므로 한 번만 계산)."""
+        key = (name, absolute)
+        row = self._argmax.get(key)
+        if row is None:
+            values = np.asarray(self.df[name], dtype=float)
+            row = self._argmax[key] = int((np.abs(values) if absolute else values).argmax())
+        return row
+
+# ======================================================================
+# 섹션 3: 행사가 기준 콜/풋 통합 프레임
+# ======================================================================
+
+# 통합 프레임에 넣는 열: (원본 열, 콜 쪽 이름, 풋 쪽 이름)
+ALIGNED_COLUMNS = (("openInterest", "call_oi", "put_oi"), ("volume", "call_volume", "put_volume"))
+
+
+def align_strikes(calls, puts):
+    """콜/풋 체인(DataFrame 또는 열 이름 → 배열 딕셔너리)을 행사가 기준으로 외부 조인(outer join)한 DataFrame을 만듭니다.
+
+    index는 양쪽 행사가의 정렬된 합집합('strike')이고, 열은 call_oi, put_oi, call_volume, put_volume입니다.
+    한쪽에만 있는 행사가의 다른 쪽 값은 0이며, 같은 행사가가 여러 행이면 값을 합칩니다.
+    모든 열은 읽기 전용 배열입니다.
+    """
+    call_strike = np.asarray(calls["strike"], dtype=float)
+    put_strike = np.asarray(puts["strike"], dtype=float)
+    strikes = np.union1d(call_strike, put_strike)
+    call_pos = np.searchsorted(strikes, call_strike)
+    put_pos = np.searchsorted(strikes, put_strike)
+
+    columns = {}
+    for source, call_name, put_name in ALIGNED_COLUMNS:
+        columns[call_name] = np.bincount(call_pos, weights=np.asarray(calls[source], dtype=float), minlength=strikes.size)
+        columns[put_name] = np.bincount(put_pos, weights=np.asarray(puts[source], dtype=float), minlength=strikes.size)
+    for values in columns.values():
+        values.flags.writeable = False
+    return pd.DataFrame(columns, index=pd.Index(strikes, name="strike"), copy=False)
+
+# ======================================================================
+# 섹션 4: 불변 체인 스냅샷
+# ======================================================================
+
+class ChainSnapshot:
+    """캐시에 저장되는 읽기 전용 옵션 체인입니다.
+
+    타입 변환은 생성 시 한 번만 하고, 숫자 열은 쓰기가 막힌 배열이라
+    여러 스레드의 분석 코드가 복사 없이 같은 객체를 안전하게 읽을 수 있습니다.
+    기존 코드와의 호환을 위해 `call_df, put_df = snapshot` 형태의 언패킹을 지원합니다.
+    """
+
+    __slots__ = ("calls", "puts", "fetched_at", "_memo", "_memo_lock", "_strike_index", "_fingerprint", "_aligned",
+                 "_by_expiry")
+
+    def __init__(self, calls, puts, fetched_at=None, normalized=False):
+        if not normalized:
+            calls, puts = normalize_chain_frame(calls), normalize_chain_frame(puts)
+        self.calls = _freeze(calls)
+        self.puts = _freeze(puts)
+        self.fetched_at = fetched_at
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+        self._strike_index = {}
+        self._fingerprint = None
+        self._aligned = None
+        self._by_expiry = None
+
+    def __iter__(self):
+        yield self.calls
+        yield self.puts
+
+    def __getitem__(self, index):
+        return (self.calls, self.puts)[index]
+
+    def __len__(self):
+        return 2
+
+    def fingerprint(self):
+        """체인 내용(열 이름과 숫자 열 값)의 해시를 반환합니다 (스냅샷마다 한 번만 계산).
+
+        수집 시각과 무관하게 내용만 보므로, 다시 받았지만 바뀌지 않은 체인이나
+        다른 워커/전체 체인에서 온 같은 체인은 같은 값을 가집니다.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for side in (self.calls, self.puts):
+                digest.update(repr(list(side.columns)).encode())
+                for col in NUMERIC_COLUMNS:
+                    if col in side.columns:
+                        digest.update(np.ascontiguousarray(side[col].to_numpy(dtype=float)))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def aligned(self):
+        """행사가 기준 콜/풋 통합 프레임을 반환합니다 (스냅샷마다 한 번만 생성)."""
+        if self._aligned is None:
+            self._aligned = align_strikes(self.calls, self.puts)
+        return self._aligned
+
+    def by_expiry(self):
+        """전체 체인('expiry' 인덱스 레벨)을 만기일별 스냅샷 딕셔너리로 나눠 반환합니다 (스냅샷마다 한 번만 나눔).
+
+        콜과 풋이 모두 있는 만기일만 담으며, 순서는 콜 체인의 만기일 순서입니다.
+        만기일별 스냅샷도 이 딕셔너리에 보관되므로 지문, 행사가 인덱스 등도 한 번만 계산됩니다.
+        """
+        if self._by_expiry is None:
+            puts = {expiry: df for expiry, df in self.puts.groupby(level="expiry", sort=False)}
+            self._by_expiry = {
+                expiry: ChainSnapshot(df.droplevel("expiry"), puts[expiry].droplevel("expiry"),
+                                      self.fetched_at, normalized=True)
+                for expiry, df in self.calls.groupby(level="expiry", sort=False) if expiry in puts
+            }
+        return self._by_expiry
+
+    def strike_index(self, side):
+        """'calls' 또는 'puts' 쪽의 정렬된 행사가 인덱스를 반환합니다 (스냅샷마다 한 번만 생성)."""
+        index = self._strike_index.get(side)
+        if index is None:
+            index = self._strike_index[side] = StrikeIndex(getattr(self, side))
+        return index
+
+    def memo(self, key, compute):
+        """이 스냅샷에서 계산한 파생 값을 key별로 한 번만 계산해 보관합니다.
+
+        스냅샷은 바뀌지 않으므로 결과는 스냅샷이 캐시에서 빠질 때까지 유효합니다.
+        조회, 오래된 항목 제거, 저장은 잠금 안에서 하고 계산은 잠금 밖에서 하므로,
+        여러 스레드가 동시에 계산하면 같은 값이 중복 계산될 수 있지만 결과는 같습니다.
+        """
+        with self._memo_lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = compute()
+        with self._memo_lock:
+            if key not in self._memo and len(self._memo) >= MEMO_MAXSIZE:
+                del self._memo[next(iter(self._memo))]
+            self._memo[key] = value
+        return value
@@ -0,0 +1,229 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# ======================================================================
+# 섹션 1: 설정
+# ======================================================================
+
+# 토큰 버킷: 초당 허용 요청 수(상한/하한)와 순간 최대 요청 수
+MAX_RATE = 5.0
+MIN_RATE = 0.5
+BURST = 10
+# 토큰을 기다리는 최대 시간(초). 넘기면 요청을 거절합니다.
+MAX_TOKEN_WAIT = 2.0
+# 백그라운드(미리 받기) 호출은 이만큼의 토큰을 실시간 요청 몫으로 남겨 두고, 남는 토큰만 씁니다.
+BACKGROUND_RESERVE = BURST / 2
+
+# 일시적 오류 재시도: 지수 백오프 + 지터
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 4.0
+
+# 서킷 브레이커: 연속 실패 횟수와 열림 유지 시간(초)
+FAILURE_THRESHOLD = 5
+OPEN_SECONDS = 30.0
+
+
+class UpstreamUnavailable(Exception):
+    """서킷 브레이커가 열려 있거나 요청 한도를 넘어 업스트림 호출을 거절했을 때 발생합니다."""
+
+
+# 일시적 오류로 보는 예외 클래스 이름의 일부. requests/curl_cffi를 직접 import하지 않도록 이름으로 비교합니다.
+TRANSIENT_ERROR_NAMES = ("RateLimit", "Timeout", "Connection", "HTTPError", "CurlError", "RequestException")
+
+
+def _class_names(error):
+    """예외의 클래스와 모든 부모 클래스 이름을 반환합니다 (예: curl_cffi DNSError → ConnectionError, CurlError)."""
+    return [cls.__name__ for cls in type(error).__mro__]
+
+
+def is_transient(error):
+    """재시도하거나 장애로 셀 만한 일시적 오류(네트워크, 요청 제한)인지 판별합니다."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(word in name for name in _class_names(error) for word in TRANSIENT_ERROR_NAMES)
+
+
+def is_throttled(error):
+    return any("RateLimit" in name for name in _class_names(error)) or "Too Many Requests" in str(error)
+
+# ======================================================================
+# 섹션 2: 적응형 토큰 버킷
+# ======================================================================
+
+class TokenBucket:
+    """요청 제한을 당하면 속도를 절반으로 줄이고, 성공할 때마다 조금씩 회복합니다 (AIMD)."""
+
+    def __init__(self, rate=MAX_RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=MAX_TOKEN_WAIT):
+        """토큰을 얻으면 True, timeout 안에 얻지 못하면 False를 반환합니다."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def try_acquire(self, reserve=0.0):
+        """기다리지 않고, reserve개를 남기고도 토큰이 남을 때만 하나를 가져갑니다."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1 + reserve:
+                self._tokens -= 1
+                return True
+            return False
+
+    def on_throttled(self):
+        with self._lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(MAX_RATE, self.rate + 0.1)
+
+# ======================================================================
+# 섹션 3: 서킷 브레이커
+# ======================================================================
+
+class CircuitBreaker:
+    """연속 실패가 쌓이면 열려서(open) 호출을 즉시 거절하고, 일정 시간 뒤 한 번만 시험 호출을 허용합니다."""
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, open_seconds=OPEN_SECONDS):
+        self.threshold = threshold
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+# ======================================================================
+# 섹션 4: 업스트림 제어기
+# ======================================================================
+
+class UpstreamGovernor:
+    """모든 업스트림(yfinance) 호출이 거쳐 가는 공유 제어기입니다.
+
+    요청 속도 제한, 일시적 오류 재시도, 서킷 브레이커를 한곳에서 처리합니다.
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket()
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0,
+                         "breaker_rejects": 0, "rate_limit_rejects": 0, "background_yields": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    @contextmanager
+    def background(self):
+        """이 블록 안에서 현재 스레드가 하는 호출을 저우선순위로 처리합니다.
+
+        토큰을 기다리지 않고, 실시간 요청 몫(BACKGROUND_RESERVE)을 남길 수 없거나 브레이커가
+        닫혀 있지 않으면 바로 UpstreamUnavailable을 던지며, 재시도하지 않습니다.
+        """
+        previous = getattr(self._local, "background", False)
+        self._local.background = True
+        try:
+            yield
+        finally:
+            self._local.background = previous
+
+    def call(self, func, *args, **kwargs):
+        """func를 제어 하에 호출합니다. 거절되면 UpstreamUnavailable을 던집니다."""
+        background = getattr(self._local, "background", False)
+        for attempt in range(MAX_RETRIES + 1):
+            if background:
+                if self.breaker.state != "closed" or not self.bucket.try_acquire(BACKGROUND_RESERVE):
+                    self._count("background_yields")
+                    raise UpstreamUnavailable("실시간 요청에 양보하기 위해 백그라운드 호출을 미룹니다.")
+            elif not self.breaker.allow():
+                self._count("breaker_rejects")
+                raise UpstreamUnavailable("업스트림 서킷 브레이커가 열려 있습니다.")
+            elif not self.bucket.acquire():
+                self._count("rate_limit_rejects")
+                # 시험 호출을 하지 못했으므로 다음 요청이 시험 호출을 할 수 있게 돌려놓습니다.
+                self.breaker.release_trial()
+                raise UpstreamUnavailable("업스트림 요청 한도를 초과했습니다.")
+            self._count("calls")
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_transient(e):
+                    # 잘못된 티커 등은 업스트림 장애가 아니므로 실패로 세지 않고, 시험 호출 자리만 돌려놓습니다.
+                    self.breaker.release_trial()
+                    raise
+                if is_throttled(e):
+                    self._count("throttled")
+                    self.bucket.on_throttled()
+                self._count("failures")
+                self.breaker.record_failure()
+                if attempt == MAX_RETRIES or background:
+                    raise
+                self._count("retries")
+                time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+                continue
+            self.bucket.on_success()
+            self.breaker.record_success()
+            return result
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {"breaker_state": self.breaker.state, "consecutive_failures": self.breaker.failures,
+                "rate_per_second": round(self.bucket.rate, 2), **counters}
+
+
+upstream = UpstreamGovernor()
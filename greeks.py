@@ -0,0 +1,311 @@
+import math
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba가 없으면 NumPy 백엔드만 사용합니다.
+    numba = None
+
+# ======================================================================
+# 섹션 1: 설정
+# ======================================================================
+
+# 블랙-숄즈 계산에 쓰는 무위험 이자율(연율)
+RISK_FREE_RATE = float(os.environ.get("RISK_FREE_RATE", 0.04))
+# 옵션 1계약당 주식 수
+CONTRACT_MULTIPLIER = 100
+# 만기 당일(0DTE) 옵션도 계산할 수 있도록 남은 기간의 하한을 반나절로 둡니다.
+MIN_DAYS_TO_EXPIRY = 0.5
+# GEX 프로파일을 계산할 가상 현재가 범위(현재가 대비 ±20%)와 격자 점 수
+SPOT_GRID_RANGE = 0.2
+SPOT_GRID_POINTS = 81
+# 전체 그릭스 계산 백엔드: "numpy", "numba", "auto"(numba가 설치되어 있으면 numba)
+GREEKS_BACKEND = os.environ.get("GREEKS_BACKEND", "auto")
+GREEK_NAMES = ("delta", "gamma", "theta", "vega", "rho")
+
+
+def years_to_expiry(days_to_expiry):
+    """남은 일수를 블랙-숄즈에 쓰는 연 단위 기간으로 바꿉니다."""
+    return max(days_to_expiry, MIN_DAYS_TO_EXPIRY) / 365.0
+
+
+def _norm_pdf(x):
+    return np.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+
+
+def _norm_cdf(x):
+    """표준정규 누적분포함수 (Abramowitz & Stegun 26.2.17, 오차 7.5e-8 이하, scipy 없이 배열 연산)."""
+    k = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = k * (0.319381530 + k * (-0.356563782 + k * (1.781477937 + k * (-1.821255978 + k * 1.330274429))))
+    upper = _norm_pdf(x) * poly
+    return np.where(x >= 0, 1.0 - upper, upper)
+
+# ======================================================================
+# 섹션 2: 블랙-숄즈 감마 (벡터화)
+# ======================================================================
+
+def bs_gamma(spot, strike, iv, t, r=RISK_FREE_RATE):
+    """블랙-숄즈 감마를 배열 연산으로 계산합니다 (콜과 풋의 감마는 같습니다).
+
+    spot, strike, iv는 서로 브로드캐스트 가능한 배열이면 되므로
+    spot에 (격자, 1), strike/iv에 (행사가,) 모양을 주면 격자 × 행사가 행렬이 한 번에 나옵니다.
+    IV가 0 이하인 계약(호가 없음)의 감마는 0입니다.
+    """
+    spot = np.asarray(spot, dtype=float)
+    strike = np.asarray(strike, dtype=float)
+    iv = np.asarray(iv, dtype=float)
+    valid = (iv > 0) & (strike > 0)
+    sigma = np.where(valid, iv, 1.0)
+    safe_strike = np.where(valid, strike, 1.0)
+    sigma_sqrt_t = sigma * math.sqrt(t)
+    d1 = (np.log(spot / safe_strike) + (r + 0.5 * sigma * sigma) * t) / sigma_sqrt_t
+    return np.where(valid, _norm_pdf(d1) / (spot * sigma_sqrt_t), 0.0)
+
+# ======================================================================
+# 섹션 3: 딜러 감마 익스포저(GEX)
+# ======================================================================
+
+def _signed_contracts(call_arrays, put_arrays):
+    """콜과 풋을 이어 붙인 (행사가, IV, 부호 있는 OI) 배열을 반환합니다.
+
+    딜러가 콜은 매도(+감마 헤지), 풋은 매수했다는 일반적인 가정에 따라 풋 OI에 -1을 곱합니다.
+    """
+    strike = np.concatenate((call_arrays["strike"], put_arrays["strike"]))
+    iv = np.concatenate((call_arrays["impliedVolatility"], put_arrays["impliedVolatility"]))
+    signed_oi = np.concatenate((call_arrays["openInterest"], -put_arrays["openInterest"]))
+    return strike, iv, signed_oi
+
+
+def _dollar_gamma(gamma, spot, signed_oi):
+    """현재가 1% 변동당 딜러가 헤지해야 하는 금액(달러)으로 감마를 환산합니다."""
+    return gamma * signed_oi * CONTRACT_MULTIPLIER * spot * spot * 0.01
+
+
+def gamma_exposure(call_arrays, put_arrays, spot, t, r=RISK_FREE_RATE, strikes=None):
+    """현재가에서 행사가별 GEX와 합계를 계산합니다.
+
+    strikes에 콜/풋 행사가의 정렬된 합집합(통합 프레임의 index)을 넘기면 그 배치에 맞춰 집계합니다.
+    (행사가 배열, 행사가별 GEX 배열, 총 GEX)를 반환합니다.
+    """
+    strike, iv, signed_oi = _signed_contracts(call_arrays, put_arrays)
+    exposure = _dollar_gamma(bs_gamma(spot, strike, iv, t, r), spot, signed_oi)
+    if strikes is None:
+        strikes, index = np.unique(strike, return_inverse=True)
+    else:
+        index = np.searchsorted(strikes, strike)
+    by_strike = np.bincount(index, weights=exposure, minlength=strikes.size)
+    return strikes, by_strike, float(exposure.sum())
+
+
+def spot_grid(spot, grid_range=SPOT_GRID_RANGE, points=SPOT_GRID_POINTS):
+    return np.linspace(spot * (1 - grid_range), spot * (1 + grid_range), points)
+
+
+def gamma_profile(call_arrays, put_arrays, spots, t, r=RISK_FREE_RATE):
+    """가상 현재가 격자의 각 점에서 총 GEX를 계산합니다.
+
+    d1 = ln(S) / (σ√t) + (-ln(K) + (r + σ²/2)t) / (σ√t) 로 나누면 계약별 항은 한 번만 계산되고,
+    격자 × 계약 행렬에서는 exp 한 번과 행렬-벡터 곱 한 번만 남습니다.
+    OI가 없거나 IV가 없는 계약은 기여가 0이므로 미리 제외합니다.
+    """
+    strike, iv, signed_oi = _signed_contracts(call_arrays, put_arrays)
+    keep = (iv > 0) & (strike > 0) & (signed_oi != 0)
+    strike, iv, signed_oi = strike[keep], iv[keep], signed_oi[keep]
+    spots = np.asarray(spots, dtype=float)
+    if strike.size == 0:
+        return np.zeros(spots.size)
+    inv_sigma_sqrt_t = 1.0 / (iv * math.sqrt(t))
+    offset = (-np.log(strike) + (r + 0.5 * iv * iv) * t) * inv_sigma_sqrt_t
+    d1 = np.multiply.outer(np.log(spots), inv_sigma_sqrt_t)
+    d1 += offset
+    d1 *= d1
+    d1 *= -0.5
+    np.exp(d1, out=d1)
+    # S² · 감마 = S · φ(d1) / (σ√t) 이므로 계약별 가중치에 1/(σ√t)를 함께 넣습니다.
+    weights = signed_oi * inv_sigma_sqrt_t * (CONTRACT_MULTIPLIER * 0.01 / math.sqrt(2 * math.pi))
+    return spots * (d1 @ weights)
+
+
+def zero_gamma_level(spots, profile):
+    """총 GEX의 부호가 바뀌는 현재가(감마 플립)를 선형 보간으로 찾습니다. 없으면 None을 반환합니다."""
+    sign = np.sign(profile)
+    crossings = np.nonzero(sign[:-1] * sign[1:] < 0)[0]
+    if crossings.size == 0:
+        return None
+    # 여러 번 바뀌면 현재가(격자 중앙)에 가장 가까운 지점을 사용합니다.
+    i = crossings[np.abs(crossings - (len(spots) - 1) / 2).argmin()]
+    x0, x1, y0, y1 = spots[i], spots[i + 1], profile[i], profile[i + 1]
+    return float(x0 - y0 * (x1 - x0) / (y1 - y0))
+
+# ======================================================================
+# 섹션 4: 전체 그릭스 엔진 (델타, 감마, 세타, 베가, 로)
+# ======================================================================
+
+def _greeks_numpy(spot, strike, iv, is_call, t, r):
+    """모든 계약의 그릭스를 배열 연산으로 계산해 (5, n) 배열로 반환합니다."""
+    valid = (iv > 0) & (strike > 0)
+    sigma = np.where(valid, iv, 1.0)
+    strike = np.where(valid, strike, 1.0)
+    sqrt_t = math.sqrt(t)
+    sigma_sqrt_t = sigma * sqrt_t
+    d1 = (np.log(spot / strike) + (r + 0.5 * sigma * sigma) * t) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    pdf_d1 = _norm_pdf(d1)
+    # 풋은 N(-d)를 쓰므로 부호를 바꿔 한 번에 계산합니다.
+    sign = np.where(is_call, 1.0, -1.0)
+    cdf_d1 = _norm_cdf(sign * d1)
+    cdf_d2 = _norm_cdf(sign * d2)
+    discounted_strike = strike * math.exp(-r * t)
+
+    out = np.empty((len(GREEK_NAMES), strike.size))
+    out[0] = sign * cdf_d1
+    out[1] = pdf_d1 / (spot * sigma_sqrt_t)
+    out[2] = (-spot * pdf_d1 * sigma / (2 * sqrt_t) - sign * r * discounted_strike * cdf_d2) / 365
+    out[3] = spot * pdf_d1 * sqrt_t / 100
+    out[4] = sign * discounted_strike * t * cdf_d2 / 100
+    out[:, ~valid] = 0.0
+    return out
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _greeks_numba(spot, strike, iv, is_call, t, r):
+        """_greeks_numpy와 같은 계산을 계약별 루프로 JIT 컴파일한 버전입니다 (임시 배열 없음)."""
+        n = strike.size
+        out = np.zeros((5, n))
+        sqrt_t = math.sqrt(t)
+        discount = math.exp(-r * t)
+        for i in range(n):
+            sigma = iv[i]
+            if sigma <= 0 or strike[i] <= 0:
+                continue
+            sigma_sqrt_t = sigma * sqrt_t
+            d1 = (math.log(spot / strike[i]) + (r + 0.5 * sigma * sigma) * t) / sigma_sqrt_t
+            d2 = d1 - sigma_sqrt_t
+            pdf_d1 = math.exp(-0.5 * d1 * d1) / math.sqrt(2 * math.pi)
+            sign = 1.0 if is_call[i] else -1.0
+            cdf_d1 = 0.5 * math.erfc(-sign * d1 / math.sqrt(2.0))
+            cdf_d2 = 0.5 * math.erfc(-sign * d2 / math.sqrt(2.0))
+            discounted_strike = strike[i] * discount
+            out[0, i] = sign * cdf_d1
+            out[1, i] = pdf_d1 / (spot * sigma_sqrt_t)
+            out[2, i] = (-spot * pdf_d1 * sigma / (2 * sqrt_t) - sign * r * discounted_strike * cdf_d2) / 365
+            out[3, i] = spot * pdf_d1 * sqrt_t / 100
+            out[4, i] = sign * discounted_strike * t * cdf_d2 / 100
+        return out
+
+
+def _resolve_backend(backend):
+    backend = backend or GREEKS_BACKEND
+    if backend == "auto":
+        return "numba" if numba is not None else "numpy"
+    if backend == "numba" and numba is None:
+        print("numba가 설치되어 있지 않아 NumPy 그릭스 백엔드를 사용합니다.")
+        return "numpy"
+    return backend
+
+
+def chain_greeks(call_arrays, put_arrays, spot, t, r=RISK_FREE_RATE, backend=None):
+    """체인의 모든 콜/풋 계약에 대해 델타, 감마, 세타(1일), 베가(IV 1%p), 로(금리 1%p)를 계산합니다.
+
+    콜과 풋을 이어 붙여 한 번에 계산한 뒤 나눕니다.
+    {"calls": {"delta": 배열, ...}, "puts": {...}}를 반환하며, IV가 없는 계약의 값은 0입니다.
+    """
+    strike = np.concatenate((call_arrays["strike"], put_arrays["strike"]))
+    iv = np.concatenate((call_arrays["impliedVolatility"], put_arrays["impliedVolatility"]))
+    is_call = np.zeros(strike.size, dtype=np.bool_)
+    is_call[:call_arrays["strike"].size] = True
+    kernel = _greeks_numba if _resolve_backend(backend) == "numba" else _greeks_numpy
+    out = kernel(float(spot), strike, iv, is_call, float(t), float(r))
+    split = call_arrays["strike"].size
+    return {
+        "calls": dict(zip(GREEK_NAMES, out[:, :split])),
+        "puts": dict(zip(GREEK_NAMES, out[:, split:])),
+    }
+
+# ======================================================================
+# 섹션 5: 호가 중간값 기반 내재변동성 계산기 (벡터화)
+# ======================================================================
+
+# 내재변동성 탐색 범위, 가격 허용 오차(달러), 최대 반복 횟수
+IV_MIN = 1e-4
+IV_MAX = 5.0
+IV_PRICE_TOLERANCE = 1e-6
+IV_MAX_ITERATIONS = 50
+
+
+def _price_and_vega(spot, strike, sigma, t, is_call, r):
+    """블랙-숄즈 가격과 (1.0 단위) 베가를 함께 계산합니다."""
+    sqrt_t = math.sqrt(t)
+    sigma_sqrt_t = sigma * sqrt_t
+    d1 = (np.log(spot / strike) + (r + 0.5 * sigma * sigma) * t) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    sign = np.where(is_call, 1.0, -1.0)
+    price = sign * (spot * _norm_cdf(sign * d1) - strike * math.exp(-r * t) * _norm_cdf(sign * d2))
+    return price, spot * _norm_pdf(d1) * sqrt_t
+
+
+def implied_volatility(price, spot, strike, t, is_call, r=RISK_FREE_RATE):
+    """옵션 가격 배열에서 내재변동성 배열을 한 번에 역산합니다.
+
+    모든 계약에 뉴턴 반복을 동시에 적용하고, 계약마다 [하한, 상한] 구간을 좁혀 가다가
+    뉴턴 단계가 구간을 벗어나거나 베가가 0에 가까우면 그 계약만 이분법 단계로 대신합니다.
+    수렴한 계약은 다음 반복에서 빠집니다. 무차익 범위를 벗어난 가격은 NaN을 반환합니다.
+    """
+    price = np.asarray(price, dtype=float)
+    strike = np.asarray(strike, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+    discounted_strike = strike * math.exp(-r * t)
+    intrinsic = np.maximum(np.where(is_call, spot - discounted_strike, discounted_strike - spot), 0)
+    ceiling = np.where(is_call, spot, discounted_strike)
+    with np.errstate(invalid="ignore"):
+        solvable = np.isfinite(price) & (strike > 0) & (price > intrinsic) & (price < ceiling)
+
+    result = np.full(price.shape, np.nan)
+    index = np.nonzero(solvable)[0]
+    if index.size == 0:
+        return result
+    target, strike, is_call = price[index], strike[index], is_call[index]
+    # 브레너-서브라마냠 근사로 시작점을 잡습니다.
+    sigma = np.clip(math.sqrt(2 * math.pi / t) * target / spot, 0.05, 3.0)
+    low = np.full(index.size, IV_MIN)
+    high = np.full(index.size, IV_MAX)
+    active = np.arange(index.size)
+
+    for _ in range(IV_MAX_ITERATIONS):
+        model, vega = _price_and_vega(spot, strike[active], sigma[active], t, is_call[active], r)
+        diff = model - target[active]
+        converged = np.abs(diff) < IV_PRICE_TOLERANCE
+        # 가격은 변동성에 대해 증가 함수이므로 오차의 부호로 구간을 좁힙니다.
+        high[active] = np.where(diff > 0, sigma[active], high[active])
+        low[active] = np.where(diff <= 0, sigma[active], low[active])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = sigma[active] - diff / vega
+        bisect = ~np.isfinite(newton) | (newton <= low[active]) | (newton >= high[active])
+        step = np.where(bisect, 0.5 * (low[active] + high[active]), newton)
+        sigma[active] = np.where(converged, sigma[active], step)
+        active = active[~converged & (high[active] - low[active] > 1e-10)]
+        if active.size == 0:
+            break
+
+    result[index] = sigma
+    return result
+
+
+def chain_implied_volatility(call_quotes, put_quotes, spot, t, r=RISK_FREE_RATE):
+    """콜/풋의 bid/ask 중간값으로 체인 전체의 IV를 다시 계산해 (콜 IV, 풋 IV)를 반환합니다.
+
+    quotes는 strike, bid, ask 배열을 담은 딕셔너리입니다.
+    양쪽 호가가 없거나 ask < bid인 계약, 계산할 수 없는 계약은 NaN입니다.
+    """
+    strike = np.concatenate((call_quotes["strike"], put_quotes["strike"]))
+    bid = np.concatenate((call_quotes["bid"], put_quotes["bid"]))
+    ask = np.concatenate((call_quotes["ask"], put_quotes["ask"]))
+    mid = np.where((bid > 0) & (ask >= bid), 0.5 * (bid + ask), np.nan)
+    is_call = np.zeros(strike.size, dtype=np.bool_)
+    is_call[:call_quotes["strike"].size] = True
+    iv = implied_volatility(mid, float(spot), strike, float(t), is_call, r)
+    split = call_quotes["strike"].size
+    return iv[:split], iv[split:]
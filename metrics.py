@@ -0,0 +1,93 @@
+import numpy as np
+
+# ======================================================================
+# 섹션 1: 지표 커널
+# ======================================================================
+
+# ATM 집중도 계산에 쓰는 현재가 대비 행사가 범위(±5%)
+ATM_BAND = 0.05
+# 박스권(지지/저항) 계산에 쓰는 현재가 대비 행사가 범위(±30%)
+BOX_RANGE_LIMIT = 0.3
+# 박스권 가중치 점수 = 미결제약정 * 0.3 + 거래량 * 0.7
+BOX_OI_WEIGHT = 0.3
+BOX_VOLUME_WEIGHT = 0.7
+
+KERNEL_COLUMNS = ("strike", "volume", "openInterest", "impliedVolatility", "change")
+
+
+def side_arrays(df):
+    """DataFrame에서 커널이 쓰는 열을 NumPy 배열로 한 번만 꺼냅니다 (스냅샷이면 복사 없음)."""
+    return {col: df[col].to_numpy(dtype=float) for col in KERNEL_COLUMNS}
+
+
+def side_metrics(arrays, index, current_price, atm_band=ATM_BAND, box_limit=BOX_RANGE_LIMIT):
+    """콜 또는 풋 한쪽의 모든 집계를 계산합니다.
+
+    index는 같은 체인의 정렬된 행사가 인덱스(chain.StrikeIndex)입니다.
+    ATM 구간/박스권 구간은 이진 탐색으로 구한 slice이고, 거래량/미결제약정 합계는 누적합의 차로 구하므로
+    현재가나 box_limit이 바뀌어도 전체 체인을 다시 훑지 않습니다.
+    IV는 요청마다 재계산 값으로 바뀔 수 있어 arrays에서 직접 읽습니다.
+    """
+    count = len(index)
+    atm_window = index.band(current_price, atm_band)
+    box_window = index.band(current_price, box_limit)
+
+    atm_row = index.nearest(current_price)
+    change_row = index.argmax("change", absolute=True)
+    top_row = index.argmax("volume")
+
+    box_strike = None
+    if index.range_sum("openInterest", box_window) != 0:
+        score = (index.sorted_values("openInterest")[box_window] * BOX_OI_WEIGHT
+                 + index.sorted_values("volume")[box_window] * BOX_VOLUME_WEIGHT)
+        best = score.max()
+        if best > 0:
+            # 점수가 같으면 원래 행 순서상 먼저 나온 계약을 고릅니다.
+            box_strike = float(arrays["strike"][index.first_row(box_window, score == best)])
+
+    volume_sum = index.total("volume")
+    return {
+        "count": count,
+        "volume_sum": volume_sum,
+        "volume_mean": volume_sum / count,
+        "atm_volume": index.range_sum("volume", atm_window),
+        "oi_sum": index.total("openInterest"),
+        "iv_mean": float(arrays["impliedVolatility"].mean()),
+        "atm_iv": float(arrays["impliedVolatility"][atm_row]),
+        "top_change": float(arrays["change"][change_row]),
+        "top_strike": float(arrays["strike"][top_row]),
+        "top_volume": float(arrays["volume"][top_row]),
+        "top_oi": float(arrays["openInterest"][top_row]),
+        "box_strike": box_strike,
+    }
+
+
+def chain_metrics(call_arrays, put_arrays, call_index, put_index, current_price, box_limit=BOX_RANGE_LIMIT):
+    """콜/풋 양쪽의 집계를 계산해 (콜 지표, 풋 지표)로 반환합니다."""
+    return (side_metrics(call_arrays, call_index, current_price, box_limit=box_limit),
+            side_metrics(put_arrays, put_index, current_price, box_limit=box_limit))
+
+# ======================================================================
+# 섹션 2: 맥스 페인
+# ======================================================================
+
+def max_pain(aligned):
+    """옵션 매수자 전체의 만기 가치가 가장 작아지는 행사가(맥스 페인)를 반환합니다.
+
+    aligned는 행사가 기준 콜/풋 통합 프레임(chain.align_strikes)입니다.
+    후보 행사가 K마다 모든 행사가의 손익을 더하면 O(n²)이지만,
+    정렬된 행사가에서 OI와 OI*행사가의 누적합을 만들어 두면
+    콜 가치 = K*ΣOI - ΣOI*s (s <= K), 풋 가치 = ΣOI*s - K*ΣOI (s > K)로
+    모든 후보를 한 번에 계산합니다 (정렬은 프레임을 만들 때 한 번, O(n log n)). OI가 없으면 None을 반환합니다.
+    """
+    strike = aligned.index.to_numpy(dtype=float)
+    call_oi = aligned["call_oi"].to_numpy()
+    put_oi = aligned["put_oi"].to_numpy()
+    if call_oi.sum() + put_oi.sum() <= 0:
+        return None
+
+    call_cum, call_cum_strike = np.cumsum(call_oi), np.cumsum(call_oi * strike)
+    put_cum, put_cum_strike = np.cumsum(put_oi), np.cumsum(put_oi * strike)
+    call_value = strike * call_cum - call_cum_strike
+    put_value = (put_cum_strike[-1] - put_cum_strike) - strike * (put_cum[-1] - put_cum)
+    return float(strike[np.argmin(call_value + put_value)])
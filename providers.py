@@ -0,0 +1,267 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import yfinance as yf
+
+from governor import is_transient
+
+# ======================================================================
+# 섹션 1: 데이터 제공자 인터페이스
+# ======================================================================
+
+class NoDataError(LookupError):
+    """데이터 소스가 해당 티커/만기일의 데이터가 없다고 명시적으로 알렸을 때 발생합니다.
+
+    이 오류만 '데이터가 없음'의 근거로 쓰이며(네거티브 캐시), 그 밖의 예외는 일시적 장애로 취급됩니다.
+    """
+
+
+class MarketDataProvider:
+    """만기일 목록, 옵션 체인, 현재가를 제공하는 데이터 소스의 기본 클래스입니다.
+
+    각 메서드는 데이터를 가져오지 못하면 예외를 던지고,
+    오류 메시지 출력과 대체값 반환은 stock_logic의 페처가 담당합니다.
+    """
+
+    name = "base"
+    # 원격 데이터 소스인지 여부. 원격이면 디스크 L2 캐시와 업스트림 제어기(governor)를 거칩니다.
+    remote = True
+
+    def get_expiry_dates(self, ticker):
+        raise NotImplementedError
+
+    def get_option_chain(self, ticker, expiry_date=None):
+        """(콜 DataFrame, 풋 DataFrame) 튜플을 반환합니다."""
+        raise NotImplementedError
+
+    def get_current_price(self, ticker):
+        raise NotImplementedError
+
+    def stats(self):
+        """제공자별 내부 지표(예: 가격 소스별 지연 시간)를 반환합니다."""
+        return {}
+
+# ======================================================================
+# 섹션 2: yfinance 제공자 (기본값)
+# ======================================================================
+
+# yf.Ticker 핸들은 만기일 목록 등을 내부에 캐시하므로 일정 시간이 지나면 새로 만듭니다.
+TICKER_HANDLE_TTL = 10 * 60
+TICKER_HANDLE_MAXSIZE = 256
+
+# 가벼운 소스부터 차례로 시도하는 현재가 조회 순서
+PRICE_SOURCES = ("fast_info", "info", "history")
+
+# yfinance가 '데이터 없음'을 명시적으로 알리는 오류 메시지 (없는 만기일, 옵션 없음, 상장 폐지)
+NO_DATA_MESSAGE = re.compile(r"cannot be found|no options|delisted", re.IGNORECASE)
+
+
+def _no_data_or_raise(error):
+    """yfinance의 명시적인 '데이터 없음' 오류면 NoDataError로 바꿔 던지고, 아니면 원래 오류를 던집니다."""
+    if NO_DATA_MESSAGE.search(str(error)):
+        raise NoDataError(str(error)) from error
+    raise error
+
+
+class YFinanceProvider(MarketDataProvider):
+    """yfinance를 사용하는 기본 제공자로, HTTP 세션과 티커 핸들을 프로세스 전체에서 공유합니다."""
+
+    name = "yfinance"
+
+    def __init__(self):
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._ticker_handles = OrderedDict()
+        self._ticker_lock = threading.Lock()
+        self._price_stats = {source: {"calls": 0, "answered": 0, "empty": 0, "errors": 0,
+                                       "total_ms": 0.0, "last_ms": None}
+                             for source in PRICE_SOURCES}
+        self._stats_lock = threading.Lock()
+
+    def _get_session(self):
+        """프로세스 전체가 공유하는 HTTP 세션(keep-alive 커넥션 풀)을 반환합니다."""
+        with self._session_lock:
+            if self._session is None:
+                try:
+                    from curl_cffi import requests as curl_requests
+                    self._session = curl_requests.Session(impersonate="chrome")
+                except ImportError:
+                    import requests
+                    self._session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32)
+                    self._session.mount("https://", adapter)
+            return self._session
+
+    def get_ticker(self, ticker):
+        """티커별 yf.Ticker 핸들을 재사용합니다 (스레드 안전)."""
+        ticker = ticker.upper()
+        now = time.monotonic()
+        with self._ticker_lock:
+            entry = self._ticker_handles.get(ticker)
+            if entry is None or now - entry[1] > TICKER_HANDLE_TTL:
+                # 세션과 crumb/쿠키는 공유되므로 핸들을 새로 만들어도 핸드셰이크가 반복되지 않습니다.
+                entry = (yf.Ticker(ticker, session=self._get_session()), now)
+                self._ticker_handles[ticker] = entry
+            self._ticker_handles.move_to_end(ticker)
+            while len(self._ticker_handles) > TICKER_HANDLE_MAXSIZE:
+                self._ticker_handles.popitem(last=False)
+            return entry[0]
+
+    def get_expiry_dates(self, ticker):
+        return sorted(self.get_ticker(ticker).options)
+
+    def get_option_chain(self, ticker, expiry_date=None):
+        try:
+            options = self.get_ticker(ticker).option_chain(expiry_date)
+        except ValueError as e:
+            _no_data_or_raise(e)
+        # 옵션이 없는 티커는 yfinance가 calls/puts를 None으로 돌려줍니다.
+        if options.calls is None or options.puts is None:
+            raise NoDataError(f"옵션 데이터가 없습니다: {ticker}, {expiry_date}")
+        return options.calls, options.puts
+
+    @staticmethod
+    def _read_price(stock, source):
+        if source == "fast_info":
+            # 차트 엔드포인트만 사용하므로 전체 quoteSummary를 받는 info보다 훨씬 가볍습니다.
+            return stock.fast_info["lastPrice"]
+        if source == "info":
+            return stock.info.get('regularMarketPrice')
+        # 마지막 수단: 당일 종가
+        return stock.history(period="1d")["Close"].iloc[-1]
+
+    def get_current_price(self, ticker):
+        # fast_info와 info는 핸들 안에 캐시되므로 가격 조회는 공유 핸들 대신 일회용 핸들을 사용합니다.
+        stock = yf.Ticker(ticker.upper(), session=self._get_session())
+        first_transient, last_error = None, None
+        for source in PRICE_SOURCES:
+            started = time.perf_counter()
+            failed = False
+            try:
+                price = self._read_price(stock, source)
+            except Exception as e:
+                price, failed, last_error = None, True, e
+                if first_transient is None and is_transient(e):
+                    first_transient = e
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            answered = bool(price) and price == price  # NaN 제외
+            with self._stats_lock:
+                stat = self._price_stats[source]
+                stat["calls"] += 1
+                stat["total_ms"] += elapsed_ms
+                stat["last_ms"] = round(elapsed_ms, 1)
+                stat["answered" if answered else "errors" if failed else "empty"] += 1
+            if answered:
+                return price
+        # 요청 제한 등 원래 오류를 그대로 던져야 업스트림 제어기가 재시도 여부를 판단할 수 있습니다.
+        # 장애 중에는 뒤쪽 소스가 네트워크 오류 대신 엉뚱한 오류(예: TypeError)를 내므로 첫 일시적 오류를 우선합니다.
+        if first_transient is not None:
+            raise first_transient
+        if last_error is not None:
+            _no_data_or_raise(last_error)
+        raise NoDataError(f"현재가를 찾을 수 없습니다: {ticker}")
+
+    def stats(self):
+        with self._stats_lock:
+            return {"price_sources": {
+                source: {**stat, "total_ms": round(stat["total_ms"], 1),
+                         "avg_ms": round(stat["total_ms"] / stat["calls"], 1) if stat["calls"] else None}
+                for source, stat in self._price_stats.items()
+            }}
+
+# ======================================================================
+# 섹션 3: 오프라인 픽스처 제공자 (부하 테스트/벤치마크용)
+# ======================================================================
+
+class FixtureProvider(MarketDataProvider):
+    """디스크에 저장된 옵션 체인을 네트워크 없이 재생하는 제공자입니다.
+
+    디렉터리 구조는 <디렉터리>/<티커>/meta.json ({"price": ..., "expiries": [...]})과
+    <디렉터리>/<티커>/<만기일>.calls.csv, <만기일>.puts.csv 입니다.
+    latency(초)만큼 매 호출마다 대기하여 원격 호출 지연을 흉내 냅니다.
+    """
+
+    name = "fixture"
+    remote = False
+
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.directory, ticker.upper())
+
+    def _meta(self, ticker):
+        try:
+            with open(os.path.join(self._ticker_dir(ticker), "meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError as e:
+            raise NoDataError(f"픽스처가 없습니다: {ticker}") from e
+
+    def _wait(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def get_expiry_dates(self, ticker):
+        self._wait()
+        return sorted(self._meta(ticker)["expiries"])
+
+    def get_option_chain(self, ticker, expiry_date=None):
+        self._wait()
+        if expiry_date is None:
+            expiry_date = sorted(self._meta(ticker)["expiries"])[0]
+        base = os.path.join(self._ticker_dir(ticker), expiry_date)
+        try:
+            return pd.read_csv(f"{base}.calls.csv"), pd.read_csv(f"{base}.puts.csv")
+        except FileNotFoundError as e:
+            raise NoDataError(f"픽스처가 없습니다: {ticker}, {expiry_date}") from e
+
+    def get_current_price(self, ticker):
+        self._wait()
+        return self._meta(ticker)["price"]
+
+
+def record_fixture(source, ticker, directory, expiries=None):
+    """source 제공자에서 받은 데이터를 FixtureProvider가 읽을 수 있는 형식으로 저장합니다."""
+    ticker_dir = os.path.join(directory, ticker.upper())
+    os.makedirs(ticker_dir, exist_ok=True)
+    all_expiries = source.get_expiry_dates(ticker)
+    saved = []
+    for expiry_date in expiries or all_expiries:
+        calls, puts = source.get_option_chain(ticker, expiry_date)
+        calls.to_csv(os.path.join(ticker_dir, f"{expiry_date}.calls.csv"), index=False)
+        puts.to_csv(os.path.join(ticker_dir, f"{expiry_date}.puts.csv"), index=False)
+        saved.append(expiry_date)
+    meta = {"price": float(source.get_current_price(ticker)), "expiries": saved}
+    with open(os.path.join(ticker_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return saved
+
+# ======================================================================
+# 섹션 4: 활성 제공자 선택
+# ======================================================================
+
+def _provider_from_env():
+    """MARKET_DATA_PROVIDER 환경 변수(yfinance 또는 fixture)로 기본 제공자를 고릅니다."""
+    if os.environ.get("MARKET_DATA_PROVIDER", "yfinance").lower() == "fixture":
+        return FixtureProvider(os.environ.get("FIXTURE_DIR", "fixtures"),
+                               latency=float(os.environ.get("FIXTURE_LATENCY_MS", "0")) / 1000)
+    return YFinanceProvider()
+
+
+_provider = _provider_from_env()
+
+
+def get_provider():
+    return _provider
+
+
+def set_provider(provider):
+    """활성 제공자를 교체합니다. 기존 캐시는 호출하는 쪽에서 비워야 합니다."""
+    global _provider
+    _provider = provider
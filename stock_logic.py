@@ -1,39 +1,214 @@
 import pandas as pd
+import numpy as np
+import os
 import re
-import yfinance as yf
+import tempfile
 import datetime
-from functools import lru_cache
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from cache import market_ttl_cache, DiskChainCache, TTLCache, NegativeResult, open_shared_cache
+from providers import get_provider, NoDataError
+from governor import upstream, UpstreamUnavailable
+from chain import ChainSnapshot, StrikeIndex, align_strikes
+from metrics import side_arrays, chain_metrics, max_pain, BOX_RANGE_LIMIT
+from surface import build_iv_surface
+from greeks import years_to_expiry, gamma_exposure, spot_grid, gamma_profile, zero_gamma_level, chain_greeks, chain_implied_volatility
 
 # ======================================================================
 # 섹션 1: 데이터 수집 및 기본 헬퍼 함수
 # ======================================================================
 
-@lru_cache(maxsize=32)
-def fetch_options_data(ticker, expiry_date=None):
-    """yfinance를 사용하여 특정 만기일의 옵션 데이터를 가져옵니다."""
+# 정규장 기준 캐시 TTL(초). 장외 시간과 주말에는 cache.market_ttl이 자동으로 늘립니다.
+PRICE_TTL = 15
+CHAIN_TTL = 5 * 60
+EXPIRY_TTL = 4 * 60 * 60
+
+# 만료 후 이 시간(초)까지는 오래된 값을 즉시 반환하고 백그라운드에서 갱신합니다.
+# 이 한도를 넘긴 항목만 요청을 막고 새로 가져옵니다.
+PRICE_STALE_TTL = 60
+CHAIN_STALE_TTL = 15 * 60
+
+# 옵션 체인과 현재가를 동시에 가져올 때 두 요청을 합쳐 기다리는 최대 시간(초)
+FETCH_DEADLINE = 20
+_fetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fetch")
+
+# 워커 재시작이나 콜드 스타트 후에도 재사용할 수 있도록 옵션 체인을 디스크에도 저장합니다.
+CHAIN_CACHE_DIR = os.environ.get(
+    "CHAIN_CACHE_DIR", os.path.join(tempfile.gettempdir(), "stock_stat_chain_cache"))
+chain_disk_cache = DiskChainCache(CHAIN_CACHE_DIR, CHAIN_TTL, stale_ttl=CHAIN_STALE_TTL)
+
+# gunicorn 워커끼리 체인/현재가/만기일을 공유하는 캐시 (redis://... 또는 sqlite:///경로, 기본값은 사용 안 함)
+SHARED_CACHE_URL = os.environ.get("SHARED_CACHE_URL", "")
+shared_cache = open_shared_cache(
+    SHARED_CACHE_URL, namespace=get_provider().name,
+    chain_factory=lambda calls, puts, fetched_at: ChainSnapshot(calls, puts, fetched_at, normalized=True))
+
+# 전체 만기일 일괄 수집 시 동시에 진행할 최대 요청 수
+BULK_FETCH_WORKERS = 6
+# 한 티커에서 서로 다른 만기일 캐시 미스가 이만큼 쌓이면 전체 체인을 백그라운드로 받아 둡니다.
+BULK_PREFETCH_AFTER = 2
+# 같은 티커의 전체 체인은 이 시간(초) 안에 다시 미리 받지 않습니다.
+BULK_PREFETCH_COOLDOWN = 30 * 60
+_bulk_pool = ThreadPoolExecutor(max_workers=BULK_FETCH_WORKERS, thread_name_prefix="bulk")
+# 미리 받기는 실시간 요청이 쓰는 _fetch_pool과 분리된 한 개의 스레드에서 저우선순위로 진행합니다.
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+_expiry_misses = TTLCache(maxsize=256)
+_prefetched = TTLCache(maxsize=256)
+
+# 분석 결과 캐시: 체인 내용 지문, 현재가, 분석 옵션이 같으면 분석과 차트 데이터 조립을 건너뜁니다.
+# 스칼라 요약은 analysis_cache에, 항목당 수백 KB인 계약/행사가별 리스트(GEX, 그릭스, 차트)는
+# 항목 수가 적은 analysis_detail_cache에 따로 두어 캐시 전체 메모리를 제한합니다.
+ANALYSIS_CACHE_TTL = CHAIN_TTL
+ANALYSIS_CACHE_MAXSIZE = 256
+ANALYSIS_DETAIL_MAXSIZE = 16
+ANALYSIS_DETAIL_KEYS = ("gamma_exposure", "greeks", "chart_data")
+analysis_cache = TTLCache(maxsize=ANALYSIS_CACHE_MAXSIZE)
+analysis_detail_cache = TTLCache(maxsize=ANALYSIS_DETAIL_MAXSIZE)
+
+# 분석에 쓸 내재변동성: "upstream"(데이터 제공자 값) 또는 "solved"(bid/ask 중간값으로 재계산)
+IV_SOURCE = os.environ.get("IV_SOURCE", "upstream")
+IV_SOURCES = ("upstream", "solved")
+
+# 잘못된 티커나 없는 만기일은 본 캐시와 분리된 네거티브 캐시에 기록해 업스트림 호출 없이 바로 거절합니다.
+# 빈 만기일 목록, 빈 체인, 제공자의 명시적인 '데이터 없음'(NoDataError)만 기록하고, 그 밖의 실패는 일시적 장애로 봅니다.
+NEGATIVE_TTL = 10 * 60
+NEGATIVE_MAXSIZE = 2048
+negative_cache = TTLCache(maxsize=NEGATIVE_MAXSIZE)
+
+def _is_definitive(error):
+    """데이터 자체가 없다는 명시적인 근거가 있는 오류인지 판별합니다."""
+    return isinstance(error, NoDataError)
+
+def _chain_fetched_at(snapshot):
+    """디스크 캐시 등에서 온 체인의 실제 수집 시각을 반환합니다."""
+    return snapshot.fetched_at if snapshot else None
+
+def _call_provider(method, *args):
+    """원격 제공자 호출은 공유 업스트림 제어기(속도 제한, 재시도, 서킷 브레이커)를 거칩니다."""
+    if get_provider().remote:
+        return upstream.call(method, *args)
+    return method(*args)
+
+def _disk_snapshot(ticker, expiry_date, allow_expired=False):
+    cached = chain_disk_cache.get(ticker, expiry_date, allow_expired=allow_expired)
+    if cached is None:
+        return None
+    return ChainSnapshot(cached[0], cached[1], cached[0].attrs.get("fetched_at"))
+
+def _load_chain(ticker, expiry_date, fallback=True):
+    """디스크 L2 캐시 또는 데이터 제공자에서 옵션 체인 스냅샷을 가져옵니다 (메모리 캐시 없음).
+
+    fallback=False면 업스트림 호출이 거절됐을 때 만료된 디스크 캐시로 대체하지 않고 UpstreamUnavailable을 그대로 던집니다.
+    """
+    provider = get_provider()
     try:
-        stock = yf.Ticker(ticker)
-        options = stock.option_chain(expiry_date)
-        call_options = options.calls
-        put_options = options.puts
+        if provider.remote:
+            cached = _disk_snapshot(ticker, expiry_date)
+            if cached is not None:
+                return cached
+        call_options, put_options = _call_provider(provider.get_option_chain, ticker, expiry_date)
         # 데이터가 전혀 없는 경우 None을 반환하여 오류 처리
         if call_options.empty and put_options.empty:
-            return None
-        return call_options, put_options
+            return NegativeResult(None)
+        # 캐시에 들어가기 전에 한 번만 정규화하고 읽기 전용으로 만듭니다.
+        snapshot = ChainSnapshot(call_options, put_options, time.time())
+        if provider.remote:
+            chain_disk_cache.set(ticker, expiry_date, snapshot.calls, snapshot.puts)
+        return snapshot
+    except UpstreamUnavailable as e:
+        if not fallback:
+            raise
+        # 업스트림을 쓸 수 없는 동안에는 만료된 디스크 캐시라도 제공합니다.
+        print(f"옵션 데이터 가져오기 거절: {ticker}, {expiry_date} - {e}")
+        return _disk_snapshot(ticker, expiry_date, allow_expired=True)
     except Exception as e:
-        print(f"yfinance 데이터 가져오기 오류: {ticker}, {expiry_date} - {e}")
+        print(f"옵션 데이터 가져오기 오류: {ticker}, {expiry_date} - {e}")
+        return NegativeResult(None) if _is_definitive(e) else None
+
+def _note_expiry_miss(ticker, expiry_date):
+    """만기일별 캐시 미스를 기록하고, 여러 만기일을 오가는 티커는 전체 체인을 미리 받습니다."""
+    missed = _expiry_misses.peek(ticker, frozenset()) | {expiry_date}
+    _expiry_misses.set(ticker, missed, CHAIN_TTL)
+    if (len(missed) >= BULK_PREFETCH_AFTER and fetch_full_chain.peek(ticker) is None
+            and _prefetched.peek(ticker) is None):
+        _prefetched.set(ticker, True, BULK_PREFETCH_COOLDOWN)
+        _prefetch_pool.submit(_prefetch_full_chain, ticker)
+
+def _prefetch_full_chain(ticker):
+    """
+    아직 캐시에 없는 만기일을 하나씩 저우선순위로 받아 만기일별 캐시에 넣은 뒤 전체 체인을 조립합니다.
+    업스트림 여유가 없으면 실시간 요청에 양보하고 중단합니다 (남은 만기일은 요청이 올 때 받습니다).
+    """
+    expiries = get_expiry_dates(ticker)
+    try:
+        with upstream.background():
+            for expiry in expiries:
+                if fetch_options_data.peek(ticker, expiry) is not None:
+                    continue
+                chain = _load_chain(ticker, expiry, fallback=False)
+                if chain is None:
+                    return
+                fetch_options_data.prime(chain, ticker, expiry)
+    except UpstreamUnavailable as e:
+        print(f"전체 체인 미리 받기 중단: {ticker} - {e}")
+        return
+    # 모든 만기일이 캐시에 있으므로 업스트림 호출 없이 조립만 합니다.
+    fetch_full_chain(ticker)
+
+def select_expiry(full_chain, expiry_date):
+    """전체 체인 스냅샷에서 한 만기일의 스냅샷을 꺼냅니다. 없으면 None을 반환합니다.
+
+    만기일별 스냅샷은 전체 체인 스냅샷에 한 번만 만들어 두므로 반복 호출해도 다시 자르거나 복사하지 않습니다.
+    """
+    by_expiry = full_chain.by_expiry()
+    if expiry_date is None:
+        expiry_date = next(iter(by_expiry), None)
+    return by_expiry.get(expiry_date)
+
+@market_ttl_cache(CHAIN_TTL, maxsize=64, stale_ttl=CHAIN_STALE_TTL,
+                  is_valid=lambda data: data is not None, timestamp_of=_chain_fetched_at,
+                  negative_cache=negative_cache, negative_ttl=NEGATIVE_TTL, shared_cache=shared_cache)
+def fetch_options_data(ticker, expiry_date=None):
+    """데이터 제공자(기본값 yfinance)를 사용하여 특정 만기일의 옵션 데이터를 가져옵니다."""
+    full_chain = fetch_full_chain.peek(ticker)
+    if full_chain is not None:
+        selected = select_expiry(full_chain, expiry_date)
+        if selected is not None:
+            return selected
+    _note_expiry_miss(ticker, expiry_date)
+    return _load_chain(ticker, expiry_date)
+
+@market_ttl_cache(CHAIN_TTL, maxsize=16, stale_ttl=CHAIN_STALE_TTL,
+                  is_valid=lambda data: data is not None, timestamp_of=_chain_fetched_at)
+def fetch_full_chain(ticker):
+    """모든 만기일의 옵션 체인을 병렬로 받아 'expiry' 인덱스 레벨을 가진 하나의 스냅샷으로 합칩니다."""
+    expiries = get_expiry_dates(ticker)
+    if not expiries:
+        return None
+    # 이미 만기일별로 캐시된 체인은 다시 받지 않습니다.
+    chains = list(_bulk_pool.map(
+        lambda expiry: fetch_options_data.peek(ticker, expiry) or _load_chain(ticker, expiry), expiries))
+    loaded = [(expiry, chain) for expiry, chain in zip(expiries, chains)
+              if isinstance(chain, ChainSnapshot)]
+    if not loaded:
         return None
+    keys = [expiry for expiry, _ in loaded]
+    call_df = pd.concat([chain.calls for _, chain in loaded], keys=keys, names=["expiry", None])
+    put_df = pd.concat([chain.puts for _, chain in loaded], keys=keys, names=["expiry", None])
+    # 가장 오래된 만기일 데이터의 수집 시각을 전체 체인의 기준 시각으로 사용합니다.
+    fetched_at = min(chain.fetched_at or time.time() for _, chain in loaded)
+    return ChainSnapshot(call_df, put_df, fetched_at, normalized=True)
 
-@lru_cache(maxsize=32)
+@market_ttl_cache(EXPIRY_TTL, maxsize=256, is_valid=bool,
+                  negative_cache=negative_cache, negative_ttl=NEGATIVE_TTL, shared_cache=shared_cache)
 def get_expiry_dates(ticker):
     """특정 티커의 모든 옵션 만기일 목록을 가져옵니다."""
     try:
-        stock = yf.Ticker(ticker)
-        return sorted(stock.options)
+        expiries = _call_provider(get_provider().get_expiry_dates, ticker)
+        return expiries if expiries else NegativeResult([])
     except Exception as e:
         print(f"만기일 가져오기 오류: {ticker} - {e}")
-        return []
+        return NegativeResult([]) if _is_definitive(e) else []
 
 def extract_expiry_date(contract_name):
     """yfinance의 contractSymbol에서 만기일을 추출합니다 (YYYY-MM-DD 형식)."""
@@ -45,94 +220,138 @@ def extract_expiry_date(contract_name):
         return f"20{raw_date[:2]}-{raw_date[2:4]}-{raw_date[4:]}"
     return "N/A"
 
-@lru_cache(maxsize=32)
+@market_ttl_cache(PRICE_TTL, maxsize=256, stale_ttl=PRICE_STALE_TTL,
+                  is_valid=lambda price: price != "N/A",
+                  negative_cache=negative_cache, negative_ttl=NEGATIVE_TTL, shared_cache=shared_cache)
 def get_current_price(ticker):
     """더 실시간에 가까운 주가를 가져옵니다."""
     try:
-        stock = yf.Ticker(ticker)
-        # 우선순위 1: 실시간 시장 가격
-        info = stock.info
-        price = info.get('regularMarketPrice')
-        if price:
-            return round(price, 2)
-        # 우선순위 2: 이전 종가 (대체 수단)
-        return round(stock.history(period="1d")["Close"].iloc[-1], 2)
+        return round(float(_call_provider(get_provider().get_current_price, ticker)), 2)
     except Exception as e:
         print(f"현재가 가져오기 오류: {ticker} - {e}")
-        return "N/A"
-
-def get_box_range_weighted(df, current_price, strike_distance_limit=0.3):
-    """미결제약정과 거래량을 가중치로 사용하여 지지/저항선을 계산합니다."""
-    if df.empty: return None
-    lower_bound = current_price * (1 - strike_distance_limit)
-    upper_bound = current_price * (1 + strike_distance_limit)
-    df_filtered = df[df["strike"].between(lower_bound, upper_bound)].copy()
-    if df_filtered.empty or df_filtered["openInterest"].sum() == 0: return None
-    
-    # 가중치 점수 계산
-    df_filtered["WeightedScore"] = df_filtered["openInterest"] * 0.3 + df_filtered["volume"] * 0.7
-    
-    if df_filtered["WeightedScore"].max() == 0: return None
-    
-    # 가장 높은 점수를 가진 행사가를 반환
-    best_strike = df_filtered.loc[df_filtered["WeightedScore"].idxmax(), "strike"]
-    return best_strike
+        return NegativeResult("N/A") if _is_definitive(e) else "N/A"
+
+def fetch_report_inputs(ticker, expiry_date):
+    """옵션 체인과 현재가를 동시에 요청하고, 하나의 마감 시간 안에 둘 다 기다립니다.
+
+    (옵션 데이터, 체인 수집 시각, 현재가, 현재가 수집 시각)을 반환합니다.
+    """
+    chain_future = _fetch_pool.submit(fetch_options_data.with_timestamp, ticker, expiry_date)
+    price_future = _fetch_pool.submit(get_current_price.with_timestamp, ticker)
+    done, _ = wait([chain_future, price_future], timeout=FETCH_DEADLINE)
+    if len(done) < 2:
+        print(f"데이터 수집 시간 초과: {ticker}, {expiry_date}")
+    options_data, chain_fetched_at = chain_future.result() if chain_future in done else (None, None)
+    current_price, price_fetched_at = price_future.result() if price_future in done else ("N/A", None)
+    return options_data, chain_fetched_at, current_price, price_fetched_at
+
+def describe_freshness(fetched_at):
+    """수집 시각(epoch 초)을 리포트에 표시할 형태로 바꿉니다."""
+    if fetched_at is None:
+        return {"fetched_at": None, "age_seconds": None}
+    fetched_dt = datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc)
+    return {"fetched_at": fetched_dt.isoformat(timespec="seconds"),
+            "age_seconds": max(int(time.time() - fetched_at), 0)}
+
+def get_metrics():
+    """페처별 캐시 적중/미스, 합쳐진(coalesced) 호출 수, 제공자 지표를 반환합니다."""
+    return {
+        "fetch_options_data": fetch_options_data.cache_info(),
+        "fetch_full_chain": fetch_full_chain.cache_info(),
+        "get_expiry_dates": get_expiry_dates.cache_info(),
+        "get_current_price": get_current_price.cache_info(),
+        "chain_disk_cache": chain_disk_cache.info(),
+        "provider": {"name": get_provider().name, **get_provider().stats()},
+        "upstream": upstream.stats(),
+        "negative_cache": negative_cache.info(),
+        "analysis_cache": analysis_cache.info(),
+        "analysis_detail_cache": analysis_detail_cache.info(),
+        "shared_cache": shared_cache.info() if shared_cache else None,
+    }
 
 # ======================================================================
 # 섹션 2: 메인 분석 함수 (parse_options_data 대체)
 # ======================================================================
 
-def analyze_data_for_visualization(ticker, expiry_date):
+def days_until(expiry_date):
+    """만기일까지 남은 일수를 반환합니다 (형식이 잘못되면 기본값 30)."""
+    try:
+        today = datetime.datetime.now(datetime.timezone.utc)
+        expiry_dt = datetime.datetime.strptime(expiry_date, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+        return (expiry_dt - today).days
+    except Exception:
+        return 30 # 기본값
+
+def solved_iv_arrays(call_df, put_df, current_price, days_to_expiry):
+    """bid/ask 중간값으로 다시 계산한 (콜 IV, 풋 IV)를 반환합니다. 호가 열이 없으면 None을 반환합니다."""
+    if not all(col in df.columns for df in (call_df, put_df) for col in ("bid", "ask")):
+        return None
+    quotes = [{col: df[col].to_numpy(dtype=float) for col in ("strike", "bid", "ask")} for df in (call_df, put_df)]
+    return chain_implied_volatility(quotes[0], quotes[1], current_price, years_to_expiry(days_to_expiry))
+
+def contract_greeks(call_arrays, put_arrays, greeks):
+    """콜/풋 계약별 그릭스 배열(chain_greeks 결과)을 행사가와 함께 소수점 4자리 리스트로 정리합니다."""
+    return {
+        side: {"strike": arrays["strike"].tolist(),
+               **{name: values.round(4).tolist() for name, values in greeks[side].items()}}
+        for side, arrays in (("calls", call_arrays), ("puts", put_arrays))
+    }
+
+def analyze_chain(call_df, put_df, current_price, expiry_date, snapshot=None, iv_source=None,
+                  strike_distance_limit=BOX_RANGE_LIMIT, details=True):
     """
-    옵션 데이터를 분석하고, 웹 시각화에 필요한 모든 데이터를 포함한
-    구조화된 딕셔너리를 반환합니다.
+    한 만기일의 콜/풋 체인으로 시장 심리, 신뢰도, 전략, 차트 데이터를 계산합니다.
+    네트워크 호출 없이 주어진 데이터만 읽습니다.
+    snapshot을 넘기면 재계산한 IV와 계약별 그릭스를 (현재가, 남은 일수)별로 스냅샷에 캐시합니다.
+    iv_source가 "solved"이면 업스트림 IV 대신 bid/ask 중간값으로 계산한 IV를 씁니다 (기본값은 IV_SOURCE).
+    strike_distance_limit은 박스권 계산에 쓰는 현재가 대비 행사가 범위입니다.
+    details=False면 만기 구조 표처럼 스칼라 지표만 필요한 경우를 위해 맥스 페인, GEX, 그릭스, 차트 데이터를 건너뜁니다.
     """
-    options_data = fetch_options_data(ticker, expiry_date)
-    if not options_data:
-        return {"error": "해당 만기일의 옵션 데이터를 가져올 수 없습니다."}
-    
-    call_df, put_df = options_data
-    
-    if call_df.empty or put_df.empty:
-        return {"error": "콜 또는 풋 옵션 데이터가 비어있습니다."}
-
     # --- 2-1. 데이터 전처리 ---
-    yf_cols = {
-        "Volume": "volume", "Open Interest": "openInterest", "Strike": "strike",
-        "Implied Volatility": "impliedVolatility", "Last Price": "lastPrice",
-        "Bid": "bid", "Ask": "ask", "Change": "change", "Contract Name": "contractSymbol"
-    }
-    for df in [call_df, put_df]:
-        if "contractSymbol" in df.columns:
-            df["contractSymbol"] = df["contractSymbol"].astype(str)
-        for col in yf_cols.values():
-            if col in df.columns and col != "contractSymbol":
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    # 타입 변환은 체인이 캐시에 들어갈 때(ChainSnapshot) 한 번만 수행되며, 여기서는 읽기만 합니다.
+    call_arrays, put_arrays = side_arrays(call_df), side_arrays(put_df)
+    # 행사가 정렬 인덱스는 스냅샷마다 한 번만 만들고, ATM/구간 조회는 이진 탐색으로 합니다.
+    if snapshot is not None:
+        call_index, put_index = snapshot.strike_index("calls"), snapshot.strike_index("puts")
+    else:
+        # 이미 꺼낸 배열로 만들어 DataFrame 열 접근을 반복하지 않습니다.
+        call_index, put_index = StrikeIndex(call_arrays), StrikeIndex(put_arrays)
 
     # --- 2-2. 핵심 지표 계산 ---
-    current_price = get_current_price(ticker)
     if not isinstance(current_price, (int, float)): 
-        current_price = call_df['strike'].median()
+        current_price = float(np.median(call_arrays["strike"]))
+    days_to_expiry = days_until(expiry_date)
+
+    def memo(key, compute):
+        return snapshot.memo(key + (current_price, days_to_expiry), compute) if snapshot is not None else compute()
+
+    # 업스트림 IV는 0이거나 오래된 값인 경우가 많아, 요청 시 호가 중간값으로 다시 계산한 IV로 바꿉니다.
+    # 계산할 수 없는 계약(호가 없음, 무차익 범위 밖)은 업스트림 IV를 그대로 둡니다.
+    iv_source = iv_source or IV_SOURCE
+    if iv_source == "solved":
+        solved = memo(("solved_iv",), lambda: solved_iv_arrays(call_df, put_df, current_price, days_to_expiry))
+        if solved is not None:
+            for arrays, iv in zip((call_arrays, put_arrays), solved):
+                arrays["impliedVolatility"] = np.where(np.isfinite(iv), iv, arrays["impliedVolatility"])
+
+    # 모든 합계/평균/ATM/최대값은 지표 커널에서 한 번에 계산합니다.
+    call_m, put_m = chain_metrics(call_arrays, put_arrays, call_index, put_index, current_price,
+                                  box_limit=strike_distance_limit)
 
-    total_call_volume = call_df['volume'].sum()
-    total_put_volume = put_df['volume'].sum()
+    total_call_volume = call_m["volume_sum"]
+    total_put_volume = put_m["volume_sum"]
     put_call_ratio = total_put_volume / total_call_volume if total_call_volume > 0 else float('inf')
 
     if put_call_ratio >= 1.2: pcr_msg = "극단적 비관 (매도 과열)"
     elif put_call_ratio >= 1.0: pcr_msg = "비관적 (하락 우려)"
     elif put_call_ratio >= 0.7: pcr_msg = "낙관적 (상승 기대)"
     else : pcr_msg= "극단적 낙관 (매수 과열)"
-    # 등가격(ATM) 옵션 찾기 및 IV Skew 계산
-    try:
-        atm_call_row = call_df.iloc[(call_df['strike'] - current_price).abs().idxmin()]
-        atm_put_row = put_df.iloc[(put_df['strike'] - current_price).abs().idxmin()]
-        atm_call_iv = atm_call_row['impliedVolatility']
-        atm_put_iv = atm_put_row['impliedVolatility']
-        iv_skew = (atm_put_iv - atm_call_iv) * 100
-    except Exception:
-        atm_call_iv = atm_put_iv = iv_skew = 0
+    # 등가격(ATM) 옵션의 IV Skew
+    atm_call_iv = call_m["atm_iv"]
+    atm_put_iv = put_m["atm_iv"]
+    iv_skew = (atm_put_iv - atm_call_iv) * 100
 
-    mean_iv = (call_df['impliedVolatility'].mean() + put_df['impliedVolatility'].mean()) / 2 * 100
+    mean_iv = (call_m["iv_mean"] + put_m["iv_mean"]) / 2 * 100
     iv_diff = abs(atm_call_iv - atm_put_iv) * 100
     high_iv = (mean_iv > 30 or iv_diff > 5)
 
@@ -143,19 +362,11 @@ def analyze_data_for_visualization(ticker, expiry_date):
 
     mean_iv_msg = "종목의 특성에 따라 크게 차이가 날 수 있습니다."
     # --- 2-3. 신뢰도 지수 계산 ---
-    try:
-        today = datetime.datetime.now(datetime.timezone.utc)
-        expiry_dt = datetime.datetime.strptime(expiry_date, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
-        days_to_expiry = (expiry_dt - today).days
-    except Exception:
-        days_to_expiry = 30 # 기본값
 
     volume_score = min((total_call_volume + total_put_volume) / 100000, 1.0)
-    oi_score = min((call_df['openInterest'].sum() + put_df['openInterest'].sum()) / 200000, 1.0)
+    oi_score = min((call_m["oi_sum"] + put_m["oi_sum"]) / 200000, 1.0)
     
-    call_atm_mask = call_df['strike'].between(current_price * 0.95, current_price * 1.05)
-    put_atm_mask = put_df['strike'].between(current_price * 0.95, current_price * 1.05)
-    atm_volume = call_df[call_atm_mask]['volume'].sum() + put_df[put_atm_mask]['volume'].sum()
+    atm_volume = call_m["atm_volume"] + put_m["atm_volume"]
     atm_concentration = atm_volume / (total_call_volume + total_put_volume + 1e-6)
     atm_score = min(atm_concentration * 2, 1.0)
 
@@ -170,13 +381,10 @@ def analyze_data_for_visualization(ticker, expiry_date):
     else: reliability_msg = "데이터 신뢰도가 낮습니다. 해당 만기일은 참고 수준으로만 해석하세요."
 
     # --- 2-4. 시장 심리 및 전략 분석 ---
-    highest_change_call = call_df.loc[call_df['change'].abs().idxmax()]
-    highest_change_put = put_df.loc[put_df['change'].abs().idxmax()]
-
-    bearish_sentiment = (put_df['volume'].mean() > call_df['volume'].mean())
-    bullish_sentiment = (call_df['volume'].mean() > put_df['volume'].mean() and 
+    bearish_sentiment = (put_m["volume_mean"] > call_m["volume_mean"])
+    bullish_sentiment = (call_m["volume_mean"] > put_m["volume_mean"] and 
                          put_call_ratio < 1 and 
-                         highest_change_call['change'] > highest_change_put['change'])
+                         call_m["top_change"] > put_m["top_change"])
     
     skew_threshold = 2.0
     is_significant_positive_skew = iv_skew > skew_threshold
@@ -198,13 +406,10 @@ def analyze_data_for_visualization(ticker, expiry_date):
         elif put_call_ratio < 0.8 and not high_iv: strategy = "👀 조심스러운 상승 기대감 (거래 약하지만 방향성 존재)"
 
     # --- 2-5. 최종 결과물 구조화 ---
-    most_traded_call_row = call_df.loc[call_df['volume'].idxmax()]
-    most_traded_put_row = put_df.loc[put_df['volume'].idxmax()]
-    put_box_min = get_box_range_weighted(put_df, current_price)
-    call_box_max = get_box_range_weighted(call_df, current_price)
+    put_box_min = put_m["box_strike"]
+    call_box_max = call_m["box_strike"]
 
     result = {
-        "ticker": ticker.upper(),
         "expiry_date": expiry_date,
         "current_price": current_price,
         "strategy": strategy,
@@ -221,19 +426,228 @@ def analyze_data_for_visualization(ticker, expiry_date):
             "message": reliability_msg
         },
         "top_options": {
-            "call": {"strike": most_traded_call_row['strike'], "volume": int(most_traded_call_row['volume']), "oi": int(most_traded_call_row['openInterest'])},
-            "put": {"strike": most_traded_put_row['strike'], "volume": int(most_traded_put_row['volume']), "oi": int(most_traded_put_row['openInterest'])}
+            "call": {"strike": call_m["top_strike"], "volume": int(call_m["top_volume"]), "oi": int(call_m["top_oi"])},
+            "put": {"strike": put_m["top_strike"], "volume": int(put_m["top_volume"]), "oi": int(put_m["top_oi"])}
         },
         "box_range": {
             "min": round(put_box_min, 1) if put_box_min else None,
             "max": round(call_box_max, 1) if call_box_max else None
         },
+        "iv_source": iv_source,
+    }
+    if not details:
+        return result
+
+    # 차트, 맥스 페인, 행사가별 GEX는 행사가 기준으로 콜/풋을 외부 조인한 통합 프레임 하나를 읽습니다.
+    aligned = snapshot.aligned() if snapshot is not None else align_strikes(call_arrays, put_arrays)
+    max_pain_strike = max_pain(aligned)
+
+    # 딜러 감마 익스포저(GEX): 현재가에서의 행사가별 값과, 가상 현재가 격자 위의 총 GEX 곡선
+    t = years_to_expiry(days_to_expiry)
+    gex_strikes, gex_by_strike, gex_total = gamma_exposure(call_arrays, put_arrays, current_price, t,
+                                                           strikes=aligned.index.to_numpy())
+    gex_spots = spot_grid(current_price)
+    gex_curve = gamma_profile(call_arrays, put_arrays, gex_spots, t)
+    zero_gamma = zero_gamma_level(gex_spots, gex_curve)
+
+    # 계약별 그릭스: 같은 스냅샷, 같은 현재가면 다시 계산하지 않도록 배열만 스냅샷에 캐시합니다
+    # (응답용 리스트는 배열보다 몇 배 크므로 분석 결과 캐시에만 둡니다).
+    greek_arrays = memo(("greeks", iv_source), lambda: chain_greeks(call_arrays, put_arrays, current_price, t))
+    greeks = contract_greeks(call_arrays, put_arrays, greek_arrays)
+
+    result.update({
+        "max_pain": round(max_pain_strike, 1) if max_pain_strike is not None else None,
+        "gamma_exposure": {
+            "total": round(gex_total),
+            "zero_gamma": round(zero_gamma, 2) if zero_gamma is not None else None,
+            "strikes": gex_strikes.tolist(),
+            "by_strike": gex_by_strike.round().tolist(),
+            "profile_spots": gex_spots.round(2).tolist(),
+            "profile": gex_curve.round().tolist(),
+        },
+        "greeks": greeks,
         "chart_data": {
-            "strikes": call_df['strike'].tolist(),
-            "call_oi": call_df['openInterest'].astype(int).tolist(),
-            "put_oi": put_df['openInterest'].astype(int).tolist(),
-            "call_volume": call_df['volume'].astype(int).tolist(),
-            "put_volume": put_df['volume'].astype(int).tolist()
+            "strikes": aligned.index.tolist(),
+            **{name: aligned[name].to_numpy().astype(int).tolist()
+               for name in ("call_oi", "put_oi", "call_volume", "put_volume")}
         }
+    })
+    return result
+
+def analyze_snapshot(snapshot, current_price, expiry_date, iv_source=None, strike_distance_limit=BOX_RANGE_LIMIT,
+                     details=True):
+    """
+    analyze_chain 결과를 (체인 내용 지문, 현재가, 만기일, 분석 옵션, 오늘 날짜)를 키로 캐시합니다.
+    스칼라 요약과 큰 리스트(ANALYSIS_DETAIL_KEYS)는 서로 다른 캐시에 두고, 반환할 때 한 딕셔너리로 합칩니다.
+    안쪽 값은 여러 요청이 공유하므로 호출하는 쪽에서 수정하면 안 됩니다.
+    """
+    key = (snapshot.fingerprint(), current_price, expiry_date, iv_source or IV_SOURCE,
+           strike_distance_limit, details, datetime.date.today())
+    summary = analysis_cache.get(key, None)
+    detail = analysis_detail_cache.get(key, None) if details else {}
+    if summary is None or detail is None:
+        result = analyze_chain(snapshot.calls, snapshot.puts, current_price, expiry_date, snapshot=snapshot,
+                               iv_source=iv_source, strike_distance_limit=strike_distance_limit, details=details)
+        summary = {name: value for name, value in result.items() if name not in ANALYSIS_DETAIL_KEYS}
+        detail = {name: result[name] for name in ANALYSIS_DETAIL_KEYS if name in result}
+        analysis_cache.set(key, summary, ANALYSIS_CACHE_TTL)
+        if details:
+            analysis_detail_cache.set(key, detail, ANALYSIS_CACHE_TTL)
+    return {**summary, **detail}
+
+def analyze_data_for_visualization(ticker, expiry_date, iv_source=None, strike_distance_limit=BOX_RANGE_LIMIT):
+    """
+    옵션 데이터를 분석하고, 웹 시각화에 필요한 모든 데이터를 포함한
+    구조화된 딕셔너리를 반환합니다.
+    """
+    options_data, chain_fetched_at, current_price, price_fetched_at = fetch_report_inputs(ticker, expiry_date)
+    if not options_data:
+        return {"error": "해당 만기일의 옵션 데이터를 가져올 수 없습니다."}
+    
+    call_df, put_df = options_data
+    
+    if call_df.empty or put_df.empty:
+        return {"error": "콜 또는 풋 옵션 데이터가 비어있습니다."}
+
+    analysis = analyze_snapshot(options_data, current_price, expiry_date, iv_source, strike_distance_limit)
+    result = {"ticker": ticker.upper(), **analysis}
+    result["data_freshness"] = {
+        "chain": describe_freshness(chain_fetched_at),
+        "price": describe_freshness(price_fetched_at),
+    }
+    return result
+
+# ======================================================================
+# 섹션 3: 만기 구조(Term Structure) 분석
+# ======================================================================
+
+def _finite_or_none(value):
+    return value if np.isfinite(value) else None
+
+def get_iv_surface(full_chain, current_price):
+    """전체 체인 스냅샷의 IV 곡면을 (현재가, 날짜)별로 스냅샷에 캐시해 반환합니다."""
+    key = ("iv_surface", current_price, datetime.date.today())
+    return full_chain.memo(key, lambda: build_iv_surface(full_chain, current_price, days_until))
+
+def analyze_term_structure(ticker, iv_source=None):
+    """
+    티커의 모든 만기일을 워커 풀에서 병렬로 분석해
+    만기별 Put/Call Ratio, IV Skew, 평균 IV, 신뢰도, 전략을 하나의 표로 반환합니다.
+    iv_source는 만기별 지표에만 적용되며, IV 곡면과 ATM IV는 업스트림 IV로 만듭니다.
+    """
+    full_future = _fetch_pool.submit(fetch_full_chain.with_timestamp, ticker)
+    price_future = _fetch_pool.submit(get_current_price.with_timestamp, ticker)
+    done, _ = wait([full_future, price_future], timeout=FETCH_DEADLINE)
+    full_chain, chain_fetched_at = full_future.result() if full_future in done else (None, None)
+    current_price, price_fetched_at = price_future.result() if price_future in done else ("N/A", None)
+    if not full_chain:
+        return {"error": "옵션 만기 구조 데이터를 가져올 수 없습니다."}
+
+    def analyze_expiry(expiry_date):
+        snapshot = select_expiry(full_chain, expiry_date)
+        if snapshot is None or snapshot.calls.empty or snapshot.puts.empty:
+            return None
+        # 표에 필요한 스칼라 지표만 계산합니다 (그릭스, GEX, 차트 데이터 생략).
+        analysis = analyze_snapshot(snapshot, current_price, expiry_date, iv_source, details=False)
+        sentiment = analysis["market_sentiment"]
+        return {
+            "expiry_date": expiry_date,
+            "days_to_expiry": days_until(expiry_date),
+            "put_call_ratio": _finite_or_none(sentiment["put_call_ratio"]),
+            "iv_skew_percent": sentiment["iv_skew_percent"],
+            "mean_iv_percent": sentiment["mean_iv_percent"],
+            "reliability": analysis["reliability"]["score"],
+            "strategy": analysis["strategy"],
+        }
+
+    expiries = list(full_chain.by_expiry())
+    rows = [row for row in _bulk_pool.map(analyze_expiry, expiries) if row]
+    if not rows:
+        return {"error": "분석할 수 있는 만기일이 없습니다."}
+
+    # 만기일 × 머니니스 IV 곡면과, 곡면에서 보간한 만기별 ATM IV
+    spot = current_price if isinstance(current_price, (int, float)) else float(full_chain.calls["strike"].median())
+    surface = get_iv_surface(full_chain, spot)
+    atm_iv = surface.iv_at([row["days_to_expiry"] for row in rows], 1.0) if surface.days.size else []
+    for row, iv in zip(rows, atm_iv):
+        row["atm_iv_percent"] = round(float(iv) * 100, 1) if np.isfinite(iv) else None
+
+    return {
+        "ticker": ticker.upper(),
+        "current_price": current_price,
+        "iv_source": iv_source or IV_SOURCE,
+        "rows": rows,
+        "chart_data": {
+            "expiries": [row["expiry_date"] for row in rows],
+            "put_call_ratio": [row["put_call_ratio"] for row in rows],
+            "iv_skew_percent": [row["iv_skew_percent"] for row in rows],
+            "mean_iv_percent": [row["mean_iv_percent"] for row in rows],
+            "reliability": [row["reliability"] for row in rows],
+        },
+        "iv_surface": surface.to_dict(),
+        "data_freshness": {
+            "chain": describe_freshness(chain_fetched_at),
+            "price": describe_freshness(price_fetched_at),
+        },
+    }
+
+# ======================================================================
+# 섹션 4: 여러 티커 일괄 분석
+# ======================================================================
+
+# 일괄 분석에서 동시에 처리할 최대 항목 수와 한 요청에 받을 수 있는 최대 항목 수
+BATCH_WORKERS = 4
+BATCH_MAX_ITEMS = 50
+# 일괄 분석 작업은 내부에서 _fetch_pool을 기다리므로 별도의 풀에서 실행합니다.
+_batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+def analyze_batch_item(ticker, expiry_date=None, include_chart=False, iv_source=None):
+    """
+    한 (티커, 만기일) 항목을 분석해 결과 또는 오류와 처리 시간(ms)을 반환합니다.
+    만기일이 없으면 가장 가까운 만기일을 사용합니다.
+    """
+    started = time.perf_counter()
+    item = {"ticker": ticker.upper(), "expiry_date": expiry_date}
+    try:
+        if not expiry_date:
+            expiries = get_expiry_dates(ticker)
+            expiry_date = expiries[0] if expiries else None
+            item["expiry_date"] = expiry_date
+        if not expiry_date:
+            item["error"] = "유효한 만기일을 찾을 수 없습니다."
+        else:
+            result = analyze_data_for_visualization(ticker, expiry_date, iv_source)
+            if result.get("error"):
+                item["error"] = result["error"]
+            else:
+                if not include_chart:
+                    result.pop("chart_data", None)
+                    result.pop("greeks", None)
+                    gex = result["gamma_exposure"]
+                    result["gamma_exposure"] = {"total": gex["total"], "zero_gamma": gex["zero_gamma"]}
+                # 분석 결과는 캐시와 공유되므로 바꿀 부분만 새 딕셔너리로 만듭니다.
+                sentiment = result["market_sentiment"]
+                result["market_sentiment"] = {**sentiment, "put_call_ratio": _finite_or_none(sentiment["put_call_ratio"])}
+                item["result"] = result
+    except Exception as e:
+        print(f"일괄 분석 오류: {ticker}, {expiry_date} - {e}")
+        item["error"] = str(e)
+    item["ok"] = "error" not in item
+    item["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return item
+
+def analyze_batch(items, include_chart=False, iv_source=None):
+    """
+    (티커, 만기일) 목록을 최대 BATCH_WORKERS개씩 동시에 분석합니다.
+    결과는 요청 순서대로, 항목마다 결과 또는 오류와 처리 시간을 담아 반환합니다.
+    """
+    started = time.perf_counter()
+    futures = [_batch_pool.submit(analyze_batch_item, ticker, expiry_date, include_chart, iv_source)
+               for ticker, expiry_date in items[:BATCH_MAX_ITEMS]]
+    results = [future.result() for future in futures]
+    return {
+        "results": results,
+        "succeeded": sum(item["ok"] for item in results),
+        "failed": sum(not item["ok"] for item in results),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
     }
-    return result
\ No newline at end of file
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from greeks import years_to_expiry
+
+# ======================================================================
+# 섹션 1: 설정
+# ======================================================================
+
+# 곡면의 머니니스(행사가 / 현재가) 격자: 0.7 ~ 1.3을 25칸으로 나눕니다.
+MONEYNESS_MIN = 0.7
+MONEYNESS_MAX = 1.3
+MONEYNESS_POINTS = 25
+
+# ======================================================================
+# 섹션 2: 내재변동성 곡면
+# ======================================================================
+
+class IVSurface:
+    """만기일 × 머니니스 격자 위의 내재변동성(IV) 곡면입니다.
+
+    iv[i, j]는 i번째 만기일, j번째 머니니스의 IV이며, 관측된 행사가 범위 밖의 칸은 NaN입니다.
+    """
+
+    __slots__ = ("spot", "expiries", "days", "moneyness", "iv")
+
+    def __init__(self, spot, expiries, days, moneyness, iv):
+        self.spot = spot
+        self.expiries = expiries
+        self.days = days
+        self.moneyness = moneyness
+        self.iv = iv
+
+    def _smile_at(self, row, moneyness):
+        """row번째 만기일의 스마일을 격자 간격이 균일하다는 점을 이용해 O(1)로 선형 보간합니다."""
+        step = self.moneyness[1] - self.moneyness[0]
+        position = np.clip((moneyness - self.moneyness[0]) / step, 0, self.moneyness.size - 1)
+        left = np.minimum(position.astype(int), self.moneyness.size - 2)
+        frac = position - left
+        return self.iv[row, left] * (1 - frac) + self.iv[row, left + 1] * frac
+
+    def iv_at(self, days, moneyness):
+        """임의의 (남은 일수, 머니니스)의 IV를 보간합니다. 배열을 넣으면 배열로 반환합니다.
+
+        머니니스 방향은 선형, 만기 방향은 총분산(σ²·t) 선형 보간이며 격자 밖은 가장자리 값을 씁니다.
+        """
+        days = np.asarray(days, dtype=float)
+        moneyness = np.asarray(moneyness, dtype=float)
+        if self.days.size == 1:
+            return self._smile_at(np.zeros(np.broadcast(days, moneyness).shape, dtype=int), moneyness)
+        upper = np.clip(np.searchsorted(self.days, days), 1, self.days.size - 1)
+        lower = upper - 1
+        t0, t1 = self.days[lower], self.days[upper]
+        weight = np.clip((days - t0) / np.maximum(t1 - t0, 1e-9), 0, 1)
+        t = np.clip(days, self.days[0], self.days[-1])
+        variance = ((1 - weight) * self._smile_at(lower, moneyness) ** 2 * t0
+                    + weight * self._smile_at(upper, moneyness) ** 2 * t1)
+        return np.sqrt(variance / np.maximum(t, 1e-9))
+
+    def to_dict(self):
+        """차트용으로 퍼센트 단위 격자를 반환합니다 (NaN은 None)."""
+        iv_percent = np.round(self.iv * 100, 1)
+        return {
+            "expiries": list(self.expiries),
+            "days": self.days.tolist(),
+            "moneyness": np.round(self.moneyness, 3).tolist(),
+            "iv_percent": [[None if np.isnan(v) else v for v in row] for row in iv_percent.tolist()],
+        }
+
+
+def build_iv_surface(full_chain, spot, days_until, points=MONEYNESS_POINTS):
+    """전체 체인 스냅샷('expiry' 인덱스 레벨)으로 IV 곡면을 만듭니다.
+
+    만기일마다 외가격(OTM) 옵션만 씁니다(현재가 아래는 풋, 위는 콜).
+    전체 계약을 (만기일, 머니니스) 순으로 한 번 정렬한 뒤 만기일 경계에서 잘라 격자에 보간합니다.
+    """
+    calls, puts = full_chain
+    expiries = list(calls.index.unique(level="expiry"))
+    expiry_index = pd.Index(expiries)
+
+    codes, moneyness, iv = [], [], []
+    for df, otm in ((calls, lambda s: s >= spot), (puts, lambda s: s < spot)):
+        strike = df["strike"].to_numpy()
+        keep = otm(strike) & (df["impliedVolatility"].to_numpy() > 0)
+        # MultiIndex의 정수 코드를 그대로 써서 만기일 문자열을 계약마다 해싱하지 않습니다.
+        level = df.index.names.index("expiry")
+        positions = expiry_index.get_indexer(df.index.levels[level])
+        codes.append(positions[df.index.codes[level]][keep])
+        moneyness.append(strike[keep] / spot)
+        iv.append(df["impliedVolatility"].to_numpy()[keep])
+    codes, moneyness, iv = np.concatenate(codes), np.concatenate(moneyness), np.concatenate(iv)
+    order = np.lexsort((moneyness, codes))
+    codes, moneyness, iv = codes[order], moneyness[order], iv[order]
+    bounds = np.searchsorted(codes, np.arange(len(expiries) + 1))
+
+    grid = np.linspace(MONEYNESS_MIN, MONEYNESS_MAX, points)
+    surface = np.full((len(expiries), points), np.nan)
+    for i in range(len(expiries)):
+        m, v = moneyness[bounds[i]:bounds[i + 1]], iv[bounds[i]:bounds[i + 1]]
+        if m.size:
+            surface[i] = np.interp(grid, m, v, left=np.nan, right=np.nan)
+
+    days = np.array([years_to_expiry(days_until(expiry)) * 365 for expiry in expiries])
+    # 만기 방향 보간을 위해 남은 일수 순으로 정렬합니다 (관측값이 하나도 없는 만기일은 제외).
+    rows = [i for i in np.argsort(days, kind="stable") if not np.isnan(surface[i]).all()]
+    return IVSurface(spot, [expiries[i] for i in rows], days[rows], grid, surface[rows])
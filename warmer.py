@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+from governor import upstream
+from stock_logic import get_expiry_dates, fetch_options_data, get_current_price, CHAIN_TTL
+
+# ======================================================================
+# 섹션 1: 설정
+# ======================================================================
+
+# 프로세스 시작 시와 주기적으로 미리 받아 둘 인기 티커 목록 (쉼표 구분)
+WARM_TICKERS = [t.strip().upper() for t in os.environ.get("WARM_TICKERS", "SPY,QQQ,TSLA,AAPL,NVDA").split(",") if t.strip()]
+# 예열 주기(초). 기본값은 옵션 체인 TTL과 같습니다.
+WARM_INTERVAL = int(os.environ.get("WARM_INTERVAL_SECONDS", CHAIN_TTL))
+# 실시간 요청이 처리 중이면 예열을 최대 이 시간(초)까지 미룹니다.
+MAX_DEFER = 5.0
+
+# ======================================================================
+# 섹션 2: 실시간 요청 추적 (예열 우선순위 양보용)
+# ======================================================================
+
+class LiveRequestTracker:
+    """처리 중인 실시간 요청 수를 세어, 예열 작업이 양보할 수 있게 합니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def begin(self):
+        with self._lock:
+            self.active += 1
+
+    def end(self):
+        with self._lock:
+            self.active = max(self.active - 1, 0)
+
+    def wait_until_idle(self, timeout=MAX_DEFER):
+        deadline = time.monotonic() + timeout
+        while self.active > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+live_requests = LiveRequestTracker()
+
+# ======================================================================
+# 섹션 3: 캐시 예열기
+# ======================================================================
+
+class CacheWarmer:
+    """인기 티커의 만기일, 근월물 옵션 체인, 현재가를 백그라운드 스레드에서 미리 캐시합니다."""
+
+    def __init__(self, tickers, interval):
+        self.tickers = tickers
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.last_run = {}
+        self.last_run_seconds = None
+
+    def warm_ticker(self, ticker):
+        """한 티커를 예열하고 걸린 시간(초)과 성공 여부를 반환합니다."""
+        started = time.perf_counter()
+        # 저우선순위로 호출하므로 토큰 여유가 없으면 기다리지 않고 실시간 요청에 양보합니다 (ok=False).
+        with upstream.background():
+            live_requests.wait_until_idle()
+            expiries = get_expiry_dates(ticker)
+            ok = bool(expiries)
+            if ok:
+                live_requests.wait_until_idle()
+                ok = fetch_options_data(ticker, expiries[0]) is not None
+                live_requests.wait_until_idle()
+                ok = get_current_price(ticker) != "N/A" and ok
+        return {"seconds": round(time.perf_counter() - started, 3), "ok": ok}
+
+    def run_once(self):
+        started = time.perf_counter()
+        results = {}
+        for ticker in self.tickers:
+            if self._stop.is_set():
+                break
+            try:
+                results[ticker] = self.warm_ticker(ticker)
+            except Exception as e:
+                print(f"캐시 예열 오류: {ticker} - {e}")
+                results[ticker] = {"seconds": None, "ok": False}
+        elapsed = round(time.perf_counter() - started, 3)
+        with self._lock:
+            self.runs += 1
+            self.last_run = results
+            self.last_run_seconds = elapsed
+        print(f"캐시 예열 완료: {len(results)}개 티커, {elapsed}초")
+        return results
+
+    def _loop(self):
+        # 리눅스에서는 스레드별 nice 값을 낮춰 실시간 요청보다 CPU 우선순위를 낮춥니다.
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None and self.tickers:
+            self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {"tickers": self.tickers, "interval": self.interval, "runs": self.runs,
+                    "last_run_seconds": self.last_run_seconds, "last_run": dict(self.last_run)}
+
+
+cache_warmer = CacheWarmer(WARM_TICKERS, WARM_INTERVAL)